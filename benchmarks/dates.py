@@ -0,0 +1,72 @@
+"""Micro-benchmark of date handling on the search hot path.
+
+    $ python -m benchmarks.dates
+
+Compares `parse_date` against trying every `strptime` format in turn (what
+it used to do), for distinct and repeated inputs, and times building the
+`created_at_i<=T` filter the cursor sends with every page.
+"""
+import argparse
+import sys
+import timeit
+
+from hn import utils
+from hn.models import FilterParser
+from hn.pagination import SearchCursor
+
+SAMPLES = [
+    '2018', '2018-09', '2018-09-03', '2018-09-03 18:45:11',
+    '2018-11-03T14:53:42Z', '2018-11-03T14:53:42.000Z',
+]
+
+
+def distinct_dates(count):
+    return ['2018-{:02d}-{:02d}T{:02d}:{:02d}:{:02d}.000Z'.format(
+        1 + i % 12, 1 + i % 28, i % 24, i % 60, i // 60 % 60)
+        for i in range(count)]
+
+
+def time_per_call(function, values, repeat):
+    best = min(timeit.repeat(
+        lambda: [function(value) for value in values],
+        number=1, repeat=repeat))
+    return best / len(values) * 1e6
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.dates')
+    parser.add_argument('--count', type=int, default=20000)
+    parser.add_argument('--repeat', type=int, default=5)
+    options = parser.parse_args(argv)
+
+    def parse_cold(value):
+        utils._parse_date_string.cache_clear()
+        return utils.parse_date(value)
+
+    repeated = SAMPLES * (options.count // len(SAMPLES))
+    distinct = distinct_dates(options.count)
+    rows = [
+        ('strptime, every format', utils._strptime, repeated),
+        ('parse_date, no memo', parse_cold, repeated),
+        ('parse_date, repeated', utils.parse_date, repeated),
+        ('strptime, hit timestamps', utils._strptime, distinct),
+        ('parse_date, hit timestamps', parse_cold, distinct),
+    ]
+    for name, function, values in rows:
+        print('{:<28} {:>8.2f} us/call'.format(
+            name, time_per_call(function, values, options.repeat)))
+
+    filters = FilterParser.parse(
+        created_at__gt='2018-01-01', points__gte=100)
+    params = {'hitsPerPage': 1000}
+    cursors = [
+        SearchCursor(1542316220 - i) for i in range(options.count)]
+    print('{:<28} {:>8.2f} us/call'.format(
+        'cursor page params', time_per_call(
+            lambda cursor: cursor.request_params(params, filters),
+            cursors, options.repeat)))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
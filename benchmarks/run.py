@@ -0,0 +1,213 @@
+"""Benchmarks of the hot paths of `hn`, against a local mock server.
+
+    $ python -m benchmarks.run --hits 50000 --latency 0.005
+    $ python -m benchmarks.run --save baseline.json
+    $ python -m benchmarks.run --compare baseline.json
+
+Each benchmark is run `--repeat` times and the best run is reported:
+throughput (rows/s), time to the first row, CPU time per row and the peak
+memory allocated by Python (measured in a separate run, as tracing slows
+everything down). With `--compare`, exits with 1 if throughput dropped or
+CPU per row grew by more than `--threshold`.
+"""
+import argparse
+import functools
+import json
+import sys
+import time
+import tracemalloc
+
+from hn import Client
+from hn.api import _build_search_params
+from hn.models import Author, Hit, Or
+from hn.tags import Comment
+
+from .server import MockServer, NEWEST
+
+BENCHMARKS = {}
+
+
+def benchmark(name):
+    def register(function):
+        BENCHMARKS[name] = function
+        return function
+    return register
+
+
+@benchmark('search_by_date')
+def search_by_date(client, options):
+    return client.search_by_date(
+        comments=True, hits_per_page=options.page_size)
+
+
+@benchmark('search_by_date:stream')
+def search_by_date_stream(client, options):
+    return client.search_by_date(
+        comments=True, hits_per_page=options.page_size, stream=True)
+
+
+@benchmark('search_by_date:prefetch')
+def search_by_date_prefetch(client, options):
+    return client.search_by_date(
+        comments=True, hits_per_page=options.page_size, prefetch=2)
+
+
+@benchmark('search_by_date:records')
+def search_by_date_records(client, options):
+    return client.search_by_date(
+        comments=True, hits_per_page=options.page_size, result_type=Hit)
+
+
+@benchmark('parallel_search_by_date')
+def parallel_search_by_date(client, options):
+    return client.parallel_search_by_date(
+        comments=True, hits_per_page=options.page_size,
+        created_at__gt=NEWEST - options.hits, windows=options.concurrency)
+
+
+@benchmark('get_items')
+def get_items(client, options):
+    return client.get_items(
+        range(1, options.items + 1), max_workers=options.concurrency)
+
+
+@benchmark('get_item')
+def get_item(client, options):
+    return (client.get_item(item_id) for item_id in range(
+        1, options.items + 1))
+
+
+@benchmark('build_search_params')
+def build_search_params(client, options):
+    return (_build_search_params(
+        author='pg', stories=True, comments=True, show_hn=True,
+        created_at__gt='2018-01-01', created_at__lt=NEWEST - i,
+        points__gte=100, num_comments__gt=10)
+        for i in range(options.builds))
+
+
+@benchmark('render_watchlist')
+def render_watchlist(client, options):
+    authors = ['user{}'.format(i) for i in range(options.watchlist)]
+    return (str(functools.reduce(Or, map(Author, authors)) & Comment)
+            for _ in range(10))
+
+
+def measure(rows):
+    """Consume `rows`, returns (count, seconds, first row seconds, cpu)."""
+    count, first = 0, None
+    started_at, cpu_started_at = time.perf_counter(), time.process_time()
+    for _ in rows:
+        if first is None:
+            first = time.perf_counter() - started_at
+        count += 1
+    return (count, time.perf_counter() - started_at, first,
+            time.process_time() - cpu_started_at)
+
+
+def run(name, base_url, options):
+    make_rows = BENCHMARKS[name]
+    runs = []
+    for _ in range(options.repeat):
+        with Client(pool_size=options.concurrency, base_url=base_url) as c:
+            runs.append(measure(make_rows(c, options)))
+    count, seconds, first, cpu = min(runs, key=lambda run: run[1])
+
+    tracemalloc.start()
+    with Client(pool_size=options.concurrency, base_url=base_url) as client:
+        measure(make_rows(client, options))
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return {
+        'rows': count,
+        'rows_per_s': count / seconds,
+        'first_row_ms': (first or 0) * 1000,
+        'cpu_us_per_row': cpu / count * 1e6 if count else 0,
+        'peak_mib': peak / 2 ** 20,
+    }
+
+
+def compare(results, baseline, threshold):
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        before = baseline[name]
+        if result['rows_per_s'] < before['rows_per_s'] * (1 - threshold):
+            regressions.append('{}: {:.0f} rows/s, was {:.0f}'.format(
+                name, result['rows_per_s'], before['rows_per_s']))
+        if result['cpu_us_per_row'] > (
+                before['cpu_us_per_row'] * (1 + threshold)):
+            regressions.append('{}: {:.1f} us/row, was {:.1f}'.format(
+                name, result['cpu_us_per_row'], before['cpu_us_per_row']))
+    return regressions
+
+
+def print_table(results, file=sys.stdout):
+    columns = '{:<26} {:>8} {:>12} {:>13} {:>11} {:>9}'
+    print(columns.format(
+        'benchmark', 'rows', 'rows/s', 'first row ms', 'cpu us/row',
+        'peak MiB'), file=file)
+    for name, result in results.items():
+        print(columns.format(
+            name, result['rows'], '{:.0f}'.format(result['rows_per_s']),
+            '{:.1f}'.format(result['first_row_ms']),
+            '{:.1f}'.format(result['cpu_us_per_row']),
+            '{:.1f}'.format(result['peak_mib'])), file=file)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.run')
+    parser.add_argument(
+        'benchmarks', nargs='*', metavar='benchmark',
+        help='benchmarks to run, all of them by default: {}'.format(
+            ', '.join(BENCHMARKS)))
+    parser.add_argument('--hits', type=int, default=20000)
+    parser.add_argument('--page-size', type=int, default=1000)
+    parser.add_argument('--items', type=int, default=1000)
+    parser.add_argument('--builds', type=int, default=10000)
+    parser.add_argument(
+        '--watchlist', type=int, default=5000,
+        help='authors ORed together in render_watchlist')
+    parser.add_argument(
+        '--latency', type=float, default=0.0,
+        help='seconds the mock server waits before each response')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--save', metavar='FILE')
+    parser.add_argument('--compare', metavar='FILE')
+    parser.add_argument('--threshold', type=float, default=0.1)
+    return parser
+
+
+def main(argv=None):
+    options = build_parser().parse_args(argv)
+    names = options.benchmarks or list(BENCHMARKS)
+    unknown = set(names) - set(BENCHMARKS)
+    if unknown:
+        print('Unknown benchmarks: {}'.format(', '.join(sorted(unknown))),
+              file=sys.stderr)
+        return 2
+
+    results = {}
+    with MockServer(hits=options.hits, latency=options.latency) as base_url:
+        for name in names:
+            results[name] = run(name, base_url, options)
+    print_table(results)
+
+    if options.save:
+        with open(options.save, 'w') as fp:
+            json.dump(results, fp, indent=2, sort_keys=True)
+    if options.compare:
+        with open(options.compare) as fp:
+            regressions = compare(results, json.load(fp), options.threshold)
+        for regression in regressions:
+            print('Regression: {}'.format(regression), file=sys.stderr)
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,176 @@
+"""Local stand-in for the Algolia HN Search API.
+
+Serves `search_by_date` pages out of `hits` synthetic hits, one per second
+going back from `NEWEST`, plus `items/<id>` and `users/<username>`. Only the
+`created_at_i` numeric filters are applied. Every response waits `latency`
+seconds first.
+"""
+import json
+import multiprocessing
+import re
+import time
+from bisect import bisect_left, bisect_right
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+NEWEST = 1542316220
+CREATED_AT_FILTER_RE = re.compile(r'^created_at_i(<=|>=|<|>|=)(-?\d+)$')
+
+
+def make_hit(object_id, created_at_i):
+    return {
+        'created_at': time.strftime(
+            '%Y-%m-%dT%H:%M:%S.000Z', time.gmtime(created_at_i)),
+        'title': None,
+        'url': None,
+        'author': 'user{}'.format(object_id % 1000),
+        'points': object_id % 500,
+        'story_text': None,
+        'comment_text': 'Comment number {}, with some text.'.format(
+            object_id),
+        'num_comments': None,
+        'story_id': object_id - object_id % 100,
+        'story_title': 'Story {}'.format(object_id - object_id % 100),
+        'story_url': 'https://example.com/',
+        'parent_id': object_id - 1,
+        'created_at_i': created_at_i,
+        '_tags': [
+            'comment', 'author_user{}'.format(object_id % 1000),
+            'story_{}'.format(object_id - object_id % 100)],
+        'objectID': str(object_id),
+        '_highlightResult': {
+            'author': {
+                'value': 'user{}'.format(object_id % 1000),
+                'matchLevel': 'none', 'matchedWords': []},
+        },
+    }
+
+
+class MockAlgolia:
+    def __init__(self, hits=100000, latency=0.0):
+        self.latency = latency
+        # Rendered once, so the server isn't what's being measured.
+        self._hits = [
+            json.dumps(make_hit(hits - i, NEWEST - i)) for i in range(hits)]
+        # Ascending copy of the (descending) timestamps, for bisecting.
+        self._timestamps = [NEWEST - hits + 1 + i for i in range(hits)]
+
+    def _matching(self, numeric_filters):
+        """Return the [start, stop) slice of hits matching the filters."""
+        lower, upper = 0, len(self._timestamps)
+        for numeric_filter in numeric_filters:
+            match = CREATED_AT_FILTER_RE.match(numeric_filter)
+            if match is None:
+                continue
+            operator, value = match.group(1), int(match.group(2))
+            if operator in ('<', '<=', '='):
+                bisect = bisect_left if operator == '<' else bisect_right
+                upper = min(upper, bisect(self._timestamps, value))
+            if operator in ('>', '>=', '='):
+                bisect = bisect_right if operator == '>' else bisect_left
+                lower = max(lower, bisect(self._timestamps, value))
+        # Hits are stored newest first.
+        total = len(self._timestamps)
+        return total - upper, max(total - upper, total - lower)
+
+    def search_by_date(self, query):
+        numeric_filters = []
+        if 'numericFilters' in query:
+            numeric_filters = query['numericFilters'][0].split(',')
+        hits_per_page = int(query.get('hitsPerPage', ['20'])[0])
+        page = int(query.get('page', ['0'])[0])
+        start, stop = self._matching(numeric_filters)
+        first = start + page * hits_per_page
+        hits = self._hits[first:min(stop, first + hits_per_page)]
+        return '{{"hits":[{}],"nbHits":{},"page":{},"hitsPerPage":{}}}'.format(
+            ','.join(hits), stop - start, page, hits_per_page)
+
+    def item(self, item_id):
+        doc = make_hit(item_id, NEWEST - item_id)
+        doc.update(id=item_id, type='comment', children=[], text=doc.pop(
+            'comment_text'))
+        return json.dumps(doc)
+
+    def user(self, username):
+        return json.dumps({
+            'username': username, 'about': '', 'karma': 1000,
+            'created_at': '2007-02-19T00:00:00.000Z'})
+
+    def handler(self):
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            # Headers and body are written separately; without this every
+            # keep-alive request stalls on delayed ACKs.
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                path = url.path.rstrip('/').split('/')
+                if mock.latency:
+                    time.sleep(mock.latency)
+                if path[-1] == 'search_by_date':
+                    body = mock.search_by_date(parse_qs(url.query))
+                elif path[-2:-1] == ['items'] and path[-1].isdigit():
+                    body = mock.item(int(path[-1]))
+                elif path[-2:-1] == ['users']:
+                    body = mock.user(path[-1])
+                else:
+                    self.send_error(404)
+                    return
+                body = body.encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def serve(self, host='127.0.0.1', port=0):
+        server = ThreadingHTTPServer((host, port), self.handler())
+        server.daemon_threads = True
+        return server
+
+
+def _serve(hits, latency, addresses):
+    server = MockAlgolia(hits, latency).serve()
+    addresses.put(server.server_address)
+    server.serve_forever()
+
+
+class MockServer:
+    """Runs `MockAlgolia` in a child process, so its CPU time and memory
+    aren't mixed up with the client's.
+
+        with MockServer(hits=10000, latency=0.01) as base_url:
+            client = Client(base_url=base_url)
+    """
+
+    def __init__(self, hits=100000, latency=0.0):
+        self.hits = hits
+        self.latency = latency
+        self._process = None
+
+    def start(self):
+        addresses = multiprocessing.Queue()
+        self._process = multiprocessing.Process(
+            target=_serve, args=(self.hits, self.latency, addresses),
+            daemon=True)
+        self._process.start()
+        host, port = addresses.get(timeout=60)
+        return 'http://{}:{}/api/v1/'.format(host, port)
+
+    def stop(self):
+        self._process.terminate()
+        self._process.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
@@ -1,5 +1,7 @@
-from .api import search_by_date
+from .api import (
+    Client, search_by_date, get_item, get_user, get_items, get_users)
 from .models import PostType, Author, StoryID
+from .pagination import SearchCursor
 
 __version__ = '0.0.3'
 __title__ = 'python-hn'
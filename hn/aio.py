@@ -0,0 +1,124 @@
+import asyncio
+from urllib.parse import urljoin
+
+import aiohttp
+
+from . import endpoints
+from .api import _build_search_params
+from .pagination import MAX_HITS_PER_PAGE, _to_cursor
+
+
+class Client:
+    def __init__(self, concurrency=20, session=None, timeout=None,
+                 base_url=endpoints.BASE_API_URL):
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.base_url = base_url
+        self._session = session
+        self._owns_session = session is None
+        self._semaphore = None
+
+    def _get_semaphore(self):
+        # Created lazily, inside the running loop: before Python 3.10,
+        # semaphores bind to the loop current when they are created.
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        return self._semaphore
+
+    def _get_session(self):
+        if self._session is None:
+            connector = aiohttp.TCPConnector(limit=self.concurrency)
+            timeout = aiohttp.ClientTimeout(total=self.timeout)
+            self._session = aiohttp.ClientSession(
+                connector=connector, timeout=timeout)
+        return self._session
+
+    async def close(self):
+        # A session given by the caller is theirs to close, and is kept.
+        if self._session is not None and self._owns_session:
+            await self._session.close()
+            self._session = None
+        self._semaphore = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def _get_json(self, path, params=None, missing_ok=False):
+        url = urljoin(self.base_url, path)
+        async with self._get_semaphore():
+            async with self._get_session().get(url, params=params) as resp:
+                if missing_ok and resp.status == 404:
+                    return None
+                resp.raise_for_status()
+                return await resp.json()
+
+    async def search_by_date(self, q=None, author=None, story_id=None,
+                             stories=None, comments=None, show_hn=None,
+                             ask_hn=None, front_page=None, polls=None,
+                             pollopt=None, tags=None, hits_per_page=1000,
+                             cursor=None, **filters):
+        params, parser = _build_search_params(
+            q=q, author=author, story_id=story_id, stories=stories,
+            comments=comments, show_hn=show_hn, ask_hn=ask_hn,
+            front_page=front_page, polls=polls, pollopt=pollopt, tags=tags,
+            hits_per_page=hits_per_page, **filters)
+
+        cursor = _to_cursor(cursor)
+        page_size = min(hits_per_page, MAX_HITS_PER_PAGE)
+        skip_pages = 0
+        while True:
+            doc = await self._get_json(
+                endpoints.SEARCH_BY_DATE_PATH,
+                params=cursor.request_params(params, parser, skip_pages))
+            hits = cursor.new_hits(doc['hits'])
+            skip_pages = 0 if hits else skip_pages + 1
+            for hit in hits:
+                cursor.advance(hit)
+                yield hit
+            if len(doc['hits']) < page_size:
+                return
+
+    async def get_item(self, item_id):
+        return await self._get_json(
+            endpoints.ITEMS_PATH.format(id=item_id), missing_ok=True)
+
+    async def get_user(self, item_id):
+        return await self._get_json(
+            endpoints.USERS_PATH.format(id=item_id), missing_ok=True)
+
+    async def get_items(self, item_ids):
+        return await asyncio.gather(
+            *[self.get_item(item_id) for item_id in item_ids])
+
+    async def get_users(self, usernames):
+        return await asyncio.gather(
+            *[self.get_user(username) for username in usernames])
+
+
+async def search_by_date(*args, **kwargs):
+    async with Client() as client:
+        async for hit in client.search_by_date(*args, **kwargs):
+            yield hit
+
+
+async def get_item(item_id):
+    async with Client() as client:
+        return await client.get_item(item_id)
+
+
+async def get_user(item_id):
+    async with Client() as client:
+        return await client.get_user(item_id)
+
+
+async def get_items(item_ids, concurrency=20):
+    async with Client(concurrency=concurrency) as client:
+        return await client.get_items(item_ids)
+
+
+async def get_users(usernames, concurrency=20):
+    async with Client(concurrency=concurrency) as client:
+        return await client.get_users(usernames)
@@ -1,9 +1,49 @@
+import codecs
+import contextlib
+import json
+import threading
+import time
+from collections import deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from urllib.parse import urljoin
+
 import requests
 import functools
 
 from . import endpoints
+from . import models
 from . import tags as tag_aliases
-from .models import FilterParser, Author, PostType, StoryID
+from . import utils
+from .models import (
+    FilterParser, Author, Or, PostType, StoryID, CreatedAtFilter,
+    to_result_type)
+from .pagination import SearchCursor, SearchResults
+from .retry import Retry
+
+# Creation time of the first HN item, used as lower bound of parallel crawls.
+FIRST_ITEM_TIMESTAMP = 1160418111
+
+STREAM_CHUNK_SIZE = 64 * 1024
+
+# Used when requests are rate limited but no retry policy was given: the
+# rate limiter already waits before throttled requests are retried.
+THROTTLED_RETRY = Retry(total=5, backoff_factor=0, status_codes=(429,))
+
+# Algolia doesn't document a limit, keep combined tag expressions (and the
+# URLs they end up in) well below what proxies accept.
+MAX_TAGS_LENGTH = 2000
+
+SHORTCUT_PARAMS = (
+    'story_id', 'stories', 'comments', 'show_hn', 'ask_hn', 'front_page',
+    'polls', 'pollopt')
+
+# Search parameters whose values can be ORed together in a single search,
+# by the tag that tells hits apart.
+BATCHED_PARAMS = {'author': Author, 'story_id': StoryID}
+
+BatchResult = namedtuple('BatchResult', ['key', 'value', 'error'])
+QueryHit = namedtuple('QueryHit', ['key', 'hit'])
+SearchJob = namedtuple('SearchJob', ['params', 'key', 'keys_by_tag'])
 
 
 def _shortcut_params_to_tags(**params):
@@ -37,27 +77,15 @@ def _shortcut_params_to_tags(**params):
     return post_type_tags
 
 
-def search(q=None, author=None, story_id=None, stories=None, comments=None,
-           show_hn=None, ask_hn=None, front_page=None, polls=None,
-           pollopt=None, created_before=None, ):
-           raise NotImplementedError()
-
-
-def search_by_date(q=None, author=None, story_id=None, stories=None,
-                   comments=None, show_hn=None, ask_hn=None, front_page=None,
-                   polls=None, pollopt=None, tags=None, hits_per_page=1000,
-                   **filters):
-    params = {
-        'hitsPerPage': hits_per_page
-    }
+def _build_search_tags(author=None, story_id=None, stories=None,
+                       comments=None, show_hn=None, ask_hn=None,
+                       front_page=None, polls=None, pollopt=None, tags=None):
     shortcut_params_defined = any([
         story_id, stories, comments, show_hn, ask_hn,
         front_page, polls, pollopt])
 
     if shortcut_params_defined and tags:
             raise ValueError("Can't combine shortcut parameters and tags")
-    if q:
-        params['query'] = q
 
     if shortcut_params_defined:
         tags = _shortcut_params_to_tags(
@@ -72,6 +100,24 @@ def search_by_date(q=None, author=None, story_id=None, stories=None,
         else:
             tags = tags & author_tag
 
+    return tags
+
+
+def _build_search_params(q=None, author=None, story_id=None, stories=None,
+                         comments=None, show_hn=None, ask_hn=None,
+                         front_page=None, polls=None, pollopt=None, tags=None,
+                         hits_per_page=1000, **filters):
+    params = {
+        'hitsPerPage': hits_per_page
+    }
+    tags = _build_search_tags(
+        author=author, story_id=story_id, stories=stories, comments=comments,
+        show_hn=show_hn, ask_hn=ask_hn, front_page=front_page, polls=polls,
+        pollopt=pollopt, tags=tags)
+
+    if q:
+        params['query'] = q
+
     if tags:
         params['tags'] = str(tags)
 
@@ -80,39 +126,507 @@ def search_by_date(q=None, author=None, story_id=None, stories=None,
         parser = FilterParser.parse(**filters)
         params['numericFilters'] = str(parser)
 
-    while True:
-        resp = requests.get(endpoints.SEARCH_BY_DATE, params=params)
-        resp.raise_for_status()
+    return params, parser
+
+
+def _created_at_range(parser):
+    lower, upper = FIRST_ITEM_TIMESTAMP, int(time.time()) + 1
+    other_filters = []
+    for filter in (parser._filters if parser else []):
+        if not isinstance(filter, CreatedAtFilter):
+            other_filters.append(filter)
+            continue
+        timestamp = int(filter.get_value())
+        if filter.operator == models.GREATER_OPERATOR:
+            lower = max(lower, timestamp + 1)
+        elif filter.operator == models.GREATER_EQUALS_OPERATOR:
+            lower = max(lower, timestamp)
+        elif filter.operator == models.LESS_OPERATOR:
+            upper = min(upper, timestamp)
+        elif filter.operator == models.LESS_EQUALS_OPERATOR:
+            upper = min(upper, timestamp + 1)
+        else:
+            lower, upper = max(lower, timestamp), min(upper, timestamp + 1)
+    return lower, upper, other_filters
+
+
+def _split_window(lower, upper, parts):
+    parts = max(1, min(parts, upper - lower))
+    step = (upper - lower) / parts
+    bounds = [lower + int(step * i) for i in range(parts)] + [upper]
+    return list(zip(bounds, bounds[1:]))
+
+
+def _window_filters(other_filters, lower, upper):
+    return FilterParser(other_filters + [
+        CreatedAtFilter.parse('created_at__gte', lower),
+        CreatedAtFilter.parse('created_at__lt', upper),
+    ])
+
+
+def _retry_after(resp):
+    try:
+        return float(resp.headers.get('Retry-After'))
+    except (TypeError, ValueError):
+        return None
+
+
+def _batch_call(fetch, key):
+    try:
+        return BatchResult(key, fetch(key), None)
+    except Exception as exc:
+        return BatchResult(key, None, exc)
+
+
+def _next_completed(pending, ordered):
+    if ordered:
+        return [pending.popleft().result()]
+    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+    for future in done:
+        pending.remove(future)
+    return [future.result() for future in done]
+
+
+def _pack_tags(tags, max_length):
+    """Yield ORs of consecutive `tags`, rendered in `max_length` chars."""
+    # Parentheses, plus a comma before every tag but the first.
+    chunk, length = [], 1
+    for tag in tags:
+        tag_length = len(str(tag)) + 1
+        if chunk and length + tag_length > max_length:
+            yield functools.reduce(Or, chunk)
+            chunk, length = [], 1
+        chunk.append(tag)
+        length += tag_length
+    if chunk:
+        yield functools.reduce(Or, chunk)
+
+
+def _plan_searches(queries, batch, max_tags_length):
+    """Turn `queries` into `SearchJob`s.
+
+    With `batch`, queries that only differ by their `author` (or else by
+    their `story_id`) become a single search of an OR of those tags;
+    `keys_by_tag` tells which queries each tag of a hit belongs to.
+    """
+    if hasattr(queries, 'items'):
+        queries = queries.items()
+    jobs, groups = [], {}
+    for key, params in queries:
+        name = next((
+            name for name in BATCHED_PARAMS if params.get(name) is not None),
+            None)
+        if batch and name is not None and not params.get('tags'):
+            rest = tuple(sorted(
+                (other, value) for other, value in params.items()
+                if other != name))
+            try:
+                groups.setdefault((name, rest), []).append(
+                    (params[name], key))
+                continue
+            except TypeError:
+                pass
+        jobs.append(SearchJob(params, key, None))
+
+    for (name, rest), members in groups.items():
+        if len(members) == 1:
+            value, key = members[0]
+            jobs.append(SearchJob(dict(rest, **{name: value}), key, None))
+            continue
+        params = dict(rest)
+        base_tags = _build_search_tags(**{
+            other: params.pop(other) for other in SHORTCUT_PARAMS + (
+                'author',) if other in params})
+        reserved = len(str(base_tags)) + 1 if base_tags else 0
+        Tag = BATCHED_PARAMS[name]
+        tags, keys_by_tag = {}, {}
+        for value, key in members:
+            tag = Tag(value)
+            tags.setdefault(str(tag), tag)
+            keys_by_tag.setdefault(str(tag), []).append(key)
+        for batch_tags in _pack_tags(
+                tags.values(), max_tags_length - reserved):
+            if base_tags:
+                batch_tags = base_tags & batch_tags
+            jobs.append(SearchJob(
+                dict(params, tags=batch_tags), None, keys_by_tag))
+    return jobs
+
+
+def search(q=None, author=None, story_id=None, stories=None, comments=None,
+           show_hn=None, ask_hn=None, front_page=None, polls=None,
+           pollopt=None, created_before=None, ):
+           raise NotImplementedError()
+
+
+def _iter_streamed_hits(resp):
+    with resp:
+        chunks = codecs.iterdecode(
+            resp.iter_content(STREAM_CHUNK_SIZE), 'utf-8')
+        yield from utils.iter_json_hits(chunks)
+
+
+class Client:
+    def __init__(self, pool_size=10, session=None, timeout=None, cache=None,
+                 memo=None, rate_limiter=None, retry=None,
+                 base_url=endpoints.BASE_API_URL, hooks=None):
+        if session is None:
+            session = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(
+                pool_connections=pool_size, pool_maxsize=pool_size)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+        self.session = session
+        self.timeout = timeout
+        self.base_url = base_url
+        self.cache = cache
+        self.memo = memo
+        self.rate_limiter = rate_limiter
+        if retry is None and rate_limiter is not None:
+            retry = THROTTLED_RETRY
+        self.retry = retry
+        self.hooks = hooks
+
+    def close(self):
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _url(self, path):
+        return urljoin(self.base_url, path)
+
+    def _get(self, endpoint, url, params=None, stream=False):
+        limiter, hooks = self.rate_limiter, self.hooks
+        attempt = 0
+        while True:
+            if limiter is not None:
+                limiter.acquire()
+            if hooks is not None:
+                hooks.on_request(endpoint, url, params)
+            started_at = time.monotonic()
+            try:
+                resp = self.session.get(
+                    url, params=params, timeout=self.timeout, stream=stream)
+            except requests.RequestException as exc:
+                if hooks is not None:
+                    hooks.on_error(
+                        endpoint, exc, time.monotonic() - started_at)
+                if self.retry is None or not self.retry.is_retryable(
+                        attempt, exception=exc):
+                    raise
+                delay = self.retry.sleep(attempt)
+                if hooks is not None:
+                    hooks.on_retry(
+                        endpoint, attempt, delay, type(exc).__name__)
+                attempt += 1
+                continue
+
+            elapsed = time.monotonic() - started_at
+            if hooks is not None:
+                hooks.on_response(
+                    endpoint, resp.status_code, elapsed,
+                    None if stream else len(resp.content))
+            if limiter is not None:
+                if resp.status_code in (429, 503):
+                    limiter.on_throttle(_retry_after(resp))
+                else:
+                    limiter.on_success(elapsed)
+            if self.retry is None or not self.retry.is_retryable(
+                    attempt, status_code=resp.status_code):
+                return resp
+            resp.close()
+            # The rate limiter already holds requests back after a 429.
+            delay = self.retry.sleep(
+                attempt, None if limiter is not None else _retry_after(resp))
+            if hooks is not None:
+                hooks.on_retry(endpoint, attempt, delay, resp.status_code)
+            attempt += 1
+
+    def _get_json(self, endpoint, url, params=None, missing_ok=False):
+        hooks = self.hooks
+        if self.cache is not None:
+            body = self.cache.get(endpoint, url, params)
+            if hooks is not None:
+                hooks.on_cache(endpoint, body is not None)
+            if body is not None:
+                return json.loads(body)
+
+        resp = self._get(endpoint, url, params=params)
+        if not resp.ok:
+            if missing_ok and resp.status_code == 404:
+                return None
+            resp.raise_for_status()
+
+        if self.cache is not None:
+            self.cache.set(endpoint, url, params, resp.text)
+        if hooks is None:
+            return resp.json()
+        started_at = time.monotonic()
         doc = resp.json()
-        if not doc['hits']:
+        if isinstance(doc, dict):
+            hooks.on_decode(
+                endpoint, time.monotonic() - started_at,
+                doc.get('processingTimeMS'), doc.get('nbHits'))
+        return doc
+
+    def search_by_date(self, q=None, author=None, story_id=None, stories=None,
+                       comments=None, show_hn=None, ask_hn=None,
+                       front_page=None, polls=None, pollopt=None, tags=None,
+                       hits_per_page=1000, cursor=None, stream=False,
+                       drop_keys=None, result_type=dict, prefetch=0,
+                       **filters):
+        params, parser = _build_search_params(
+            q=q, author=author, story_id=story_id, stories=stories,
+            comments=comments, show_hn=show_hn, ask_hn=ask_hn,
+            front_page=front_page, polls=polls, pollopt=pollopt, tags=tags,
+            hits_per_page=hits_per_page, **filters)
+
+        return SearchResults(
+            self, params, parser, cursor=cursor, stream=stream,
+            drop_keys=drop_keys, result_type=result_type, prefetch=prefetch)
+
+    def _get_search_page(self, params):
+        return self._get_json(
+            'search_by_date', self._url(endpoints.SEARCH_BY_DATE_PATH),
+            params=params)
+
+    def _stream_search_page(self, params):
+        # Cached pages are read whole, there's nothing to gain streaming them.
+        if self.cache is not None:
+            return iter(self._get_search_page(params)['hits'])
+
+        # The request is made (and retried by `_get`) right away, so only
+        # errors while reading the body come out of the returned iterator.
+        url = self._url(endpoints.SEARCH_BY_DATE_PATH)
+        resp = self._get('search_by_date', url, params, stream=True)
+        if not resp.ok:
+            resp.close()
+            resp.raise_for_status()
+        return _iter_streamed_hits(resp)
+
+    def parallel_search_by_date(self, q=None, author=None, story_id=None,
+                                stories=None, comments=None, show_hn=None,
+                                ask_hn=None, front_page=None, polls=None,
+                                pollopt=None, tags=None, hits_per_page=1000,
+                                windows=8, max_workers=None,
+                                max_window_hits=20000, result_type=dict,
+                                **filters):
+        """Crawl the `created_at` range split in disjoint windows.
+
+        Each window (`created_at_i >= lower` and `< upper`) is crawled on its
+        own thread; windows holding more than `max_window_hits` hits are split
+        again, so no window dominates the crawl. Hits are yielded page by page
+        as windows make progress, not in date order.
+        """
+        params, parser = _build_search_params(
+            q=q, author=author, story_id=story_id, stories=stories,
+            comments=comments, show_hn=show_hn, ask_hn=ask_hn,
+            front_page=front_page, polls=polls, pollopt=pollopt, tags=tags,
+            hits_per_page=hits_per_page, **filters)
+        lower, upper, other_filters = _created_at_range(parser)
+        if lower >= upper:
+            return iter(())
+
+        return self._parallel_search(
+            params, other_filters, _split_window(lower, upper, windows),
+            max_workers or windows, max_window_hits, result_type)
+
+    def _crawl_window(self, params, other_filters, max_window_hits,
+                      result_type, window, put, submit):
+        """Crawl `window`, putting its pages of hits with `put`, or submit
+        the windows it's split into."""
+        lower, upper = window
+        parser = _window_filters(other_filters, lower, upper)
+        params = dict(params, numericFilters=str(parser))
+        doc = self._get_search_page(params)
+        if doc['nbHits'] > max_window_hits and upper - lower > 1:
+            parts = -(-doc['nbHits'] // max_window_hits)
+            for window in _split_window(lower, upper, parts):
+                submit(functools.partial(
+                    self._crawl_window, params, other_filters,
+                    max_window_hits, result_type, window))
             return
-        for hit in doc['hits']:
-            yield hit
-        if not parser:
-            parser = FilterParser.parse(created_at__lt=hit['created_at'])
-        else:
-            parser = parser.replace(created_at__lt=hit['created_at'])
+        utils.put_pages(SearchResults(
+            self, params, parser, first_page=doc, result_type=result_type),
+            params['hitsPerPage'], put)
 
-        params['numericFilters'] = str(parser)
+    def _parallel_search(self, params, other_filters, windows, max_workers,
+                         max_window_hits, result_type):
+        # Windows stream their pages through a bounded queue, so hits are
+        # yielded as they arrive and at most a few pages per worker are held.
+        tasks = [
+            functools.partial(
+                self._crawl_window, params, other_filters, max_window_hits,
+                result_type, window)
+            for window in windows]
+        with contextlib.closing(utils.fan_in(tasks, max_workers)) as pages:
+            for page in pages:
+                yield from page
+
+    def multi_search(self, queries, max_workers=8, batch=True,
+                     max_tags_length=MAX_TAGS_LENGTH, result_type=dict):
+        """Run many searches at once, yielding `QueryHit(key, hit)`s.
+
+        `queries` maps keys to `search_by_date` arguments. Up to
+        `max_workers` searches run concurrently, sharing the connection pool
+        and rate limiter of the client, and their hits are yielded as they
+        arrive. With `batch`, queries that only differ by `author` (or
+        `story_id`) are combined into ORs of those tags (of up to
+        `max_tags_length` chars) and their hits dispatched back to each query
+        using their `_tags`.
+        """
+        jobs = _plan_searches(queries, batch, max_tags_length)
+        return self._fan_in(jobs, max_workers, result_type)
+
+    def search_by_authors(self, authors, max_workers=8,
+                          max_tags_length=MAX_TAGS_LENGTH, result_type=dict,
+                          **params):
+        """Run the search given by `params` for each of `authors`.
+
+        Authors are packed into as few searches as `max_tags_length` allows;
+        yields `QueryHit(author, hit)`s as they arrive.
+        """
+        return self._search_each(
+            'author', authors, max_workers, max_tags_length, result_type,
+            params)
+
+    def search_by_story_ids(self, story_ids, max_workers=8,
+                            max_tags_length=MAX_TAGS_LENGTH,
+                            result_type=dict, **params):
+        """Like `search_by_authors`, yielding `QueryHit(story_id, hit)`s."""
+        return self._search_each(
+            'story_id', story_ids, max_workers, max_tags_length, result_type,
+            params)
+
+    def _search_each(self, name, values, max_workers, max_tags_length,
+                     result_type, params):
+        queries = [(value, dict(params, **{name: value})) for value in values]
+        return self.multi_search(
+            queries, max_workers=max_workers,
+            max_tags_length=max_tags_length, result_type=result_type)
+
+    def _run_search_job(self, job, put, submit):
+        def route(page):
+            if job.keys_by_tag is None:
+                return [QueryHit(job.key, hit) for hit in page]
+            return [
+                QueryHit(key, hit) for hit in page
+                for tag in hit.get('_tags', ())
+                for key in job.keys_by_tag.get(tag, ())]
+
+        utils.put_pages(
+            self.search_by_date(**job.params),
+            job.params.get('hits_per_page', 1000),
+            lambda page: put(route(page)))
+
+    def _fan_in(self, jobs, max_workers, result_type):
+        tasks = [functools.partial(self._run_search_job, job) for job in jobs]
+        with contextlib.closing(utils.fan_in(tasks, max_workers)) as pages:
+            for page in pages:
+                for key, hit in page:
+                    yield QueryHit(key, to_result_type(hit, result_type))
+
+    def _get_memoized(self, endpoint, url):
+        load = functools.partial(self._get_json, endpoint, url, missing_ok=True)
+        if self.memo is None:
+            return load()
+        return self.memo.get_or_load(url, load)
+
+    def get_item(self, item_id, result_type=dict):
+        return to_result_type(self._get_memoized(
+            'items', self._url(endpoints.ITEMS_PATH.format(id=item_id))),
+            result_type)
+
+    def get_user(self, item_id, result_type=dict):
+        return to_result_type(self._get_memoized(
+            'users', self._url(endpoints.USERS_PATH.format(id=item_id))),
+            result_type)
+
+    def get_items(self, item_ids, max_workers=10, ordered=True,
+                  result_type=dict):
+        fetch = functools.partial(self.get_item, result_type=result_type)
+        return self._fetch_many(fetch, item_ids, max_workers, ordered)
+
+    def get_users(self, usernames, max_workers=10, ordered=True,
+                  result_type=dict):
+        fetch = functools.partial(self.get_user, result_type=result_type)
+        return self._fetch_many(fetch, usernames, max_workers, ordered)
+
+    def _fetch_many(self, fetch, keys, max_workers, ordered):
+        """Yield a `BatchResult` per key, fetched from `max_workers` threads.
+
+        Errors are reported in `BatchResult.error` instead of being raised.
+        With `ordered=False` results are yielded as soon as they're fetched.
+        """
+        max_pending = max_workers * 2
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            pending = deque()
+            try:
+                for key in keys:
+                    pending.append(executor.submit(_batch_call, fetch, key))
+                    if len(pending) >= max_pending:
+                        yield from _next_completed(pending, ordered)
+                while pending:
+                    yield from _next_completed(pending, ordered)
+            finally:
+                for future in pending:
+                    future.cancel()
+
+
+_default_client = None
+_default_client_lock = threading.Lock()
+
+
+def get_default_client():
+    global _default_client
+    if _default_client is None:
+        with _default_client_lock:
+            if _default_client is None:
+                _default_client = Client()
+    return _default_client
+
+
+def set_default_client(client):
+    global _default_client
+    with _default_client_lock:
+        _default_client = client
+
+
+def search_by_date(*args, **kwargs):
+    return get_default_client().search_by_date(*args, **kwargs)
+
+
+def parallel_search_by_date(*args, **kwargs):
+    return get_default_client().parallel_search_by_date(*args, **kwargs)
+
+
+def multi_search(queries, **kwargs):
+    return get_default_client().multi_search(queries, **kwargs)
+
+
+def search_by_authors(authors, **kwargs):
+    return get_default_client().search_by_authors(authors, **kwargs)
+
+
+def search_by_story_ids(story_ids, **kwargs):
+    return get_default_client().search_by_story_ids(story_ids, **kwargs)
 
 
-def get_item(item_id):
-    resp = requests.get(endpoints.ITEMS.format(id=item_id))
+def get_item(item_id, **kwargs):
+    return get_default_client().get_item(item_id, **kwargs)
 
-    if not resp.ok:
-        if resp.status_code == 404:
-            return None
-        resp.raise_for_status()
 
-    return resp.json()
+def get_user(item_id, **kwargs):
+    return get_default_client().get_user(item_id, **kwargs)
 
 
-def get_user(item_id):
-    resp = requests.get(endpoints.USERS.format(id=item_id))
+def get_items(item_ids, **kwargs):
+    return get_default_client().get_items(item_ids, **kwargs)
 
-    if not resp.ok:
-        if resp.status_code == 404:
-            return None
-        resp.raise_for_status()
 
-    return resp.json()
+def get_users(usernames, **kwargs):
+    return get_default_client().get_users(usernames, **kwargs)
@@ -0,0 +1,239 @@
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from urllib.parse import urlencode
+
+UPPER_CREATED_AT_RE = re.compile(r'created_at_i<=?(\d+)')
+
+
+def cache_key(url, params=None):
+    if not params:
+        return url
+    return '{}?{}'.format(url, urlencode(sorted(
+        (key, str(value)) for key, value in params.items())))
+
+
+ENDPOINTS = ('search_by_date', 'items', 'users')
+
+
+class SQLiteCache:
+    """Response cache stored in a SQLite database.
+
+    `ttl` is the time to live in seconds (`None` never expires), either one
+    for every endpoint or a dict keyed by endpoint name (`search_by_date`,
+    `items`, `users`), which has to cover every endpoint or have a `default`.
+    Search pages whose `created_at` upper bound is more than `stable_after`
+    seconds old never expire. When `max_size` (bytes) is exceeded, the least
+    recently used responses are evicted.
+    """
+
+    def __init__(self, path, ttl=None, max_size=None, stable_after=None):
+        if isinstance(ttl, dict) and 'default' not in ttl:
+            missing = [
+                endpoint for endpoint in ENDPOINTS if endpoint not in ttl]
+            if missing:
+                raise ValueError(
+                    "ttl has no entry for {} and no 'default'".format(
+                        ', '.join(missing)))
+        self.path = str(path)
+        self.ttl = ttl
+        self.max_size = max_size
+        self.stable_after = stable_after
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute(
+                'CREATE TABLE IF NOT EXISTS responses ('
+                'key TEXT PRIMARY KEY, endpoint TEXT, body TEXT, '
+                'size INTEGER, expires_at REAL, accessed_at REAL)')
+            self._conn.execute(
+                'CREATE INDEX IF NOT EXISTS responses_accessed_at '
+                'ON responses (accessed_at)')
+            self._conn.execute(
+                'CREATE INDEX IF NOT EXISTS responses_expires_at '
+                'ON responses (expires_at)')
+            # Running total of the sizes, kept up to date in the same
+            # transactions as the responses, so writes don't sum the table.
+            self._conn.execute(
+                'CREATE TABLE IF NOT EXISTS total_size ('
+                'id INTEGER PRIMARY KEY CHECK (id = 0), size INTEGER)')
+            self._conn.execute(
+                'INSERT OR IGNORE INTO total_size (id, size) '
+                'SELECT 0, COALESCE(SUM(size), 0) FROM responses')
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def ttl_for(self, endpoint, params=None):
+        if endpoint == 'search_by_date' and self.stable_after is not None:
+            match = UPPER_CREATED_AT_RE.search(
+                str((params or {}).get('numericFilters', '')))
+            if match and int(match.group(1)) < time.time() - self.stable_after:
+                return None
+        if isinstance(self.ttl, dict):
+            if endpoint in self.ttl:
+                return self.ttl[endpoint]
+            if 'default' not in self.ttl:
+                raise ValueError('No ttl for endpoint {}'.format(endpoint))
+            return self.ttl['default']
+        return self.ttl
+
+    def get(self, endpoint, url, params=None):
+        key = cache_key(url, params)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT body, expires_at FROM responses WHERE key = ?',
+                (key,)).fetchone()
+            if row is None or (row[1] is not None and row[1] <= now):
+                self.misses += 1
+                return None
+            with self._conn:
+                self._conn.execute(
+                    'UPDATE responses SET accessed_at = ? WHERE key = ?',
+                    (now, key))
+            self.hits += 1
+            return row[0]
+
+    def set(self, endpoint, url, params, body):
+        ttl = self.ttl_for(endpoint, params)
+        now = time.time()
+        expires_at = None if ttl is None else now + ttl
+        key = cache_key(url, params)
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                'SELECT size FROM responses WHERE key = ?', (key,)).fetchone()
+            self._conn.execute(
+                'INSERT OR REPLACE INTO responses '
+                '(key, endpoint, body, size, expires_at, accessed_at) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                (key, endpoint, body, len(body), expires_at, now))
+            self._add_size(len(body) - (row[0] if row else 0))
+            if self.max_size is not None:
+                self._evict(now)
+
+    def _add_size(self, delta):
+        if delta:
+            self._conn.execute(
+                'UPDATE total_size SET size = size + ? WHERE id = 0', (delta,))
+
+    def _total_size(self):
+        return self._conn.execute(
+            'SELECT size FROM total_size WHERE id = 0').fetchone()[0]
+
+    def _evict(self, now):
+        expired, = self._conn.execute(
+            'SELECT COALESCE(SUM(size), 0) FROM responses '
+            'WHERE expires_at <= ?', (now,)).fetchone()
+        if expired:
+            self._conn.execute(
+                'DELETE FROM responses WHERE expires_at <= ?', (now,))
+            self._add_size(-expired)
+        total = self._total_size()
+        if total <= self.max_size:
+            return
+        rows = self._conn.execute(
+            'SELECT key, size FROM responses ORDER BY accessed_at')
+        evicted, freed = [], 0
+        for key, size in rows:
+            if total - freed <= self.max_size:
+                break
+            evicted.append((key,))
+            freed += size
+        self._conn.executemany('DELETE FROM responses WHERE key = ?', evicted)
+        self._add_size(-freed)
+        self.evictions += len(evicted)
+
+    def clear(self):
+        with self._lock, self._conn:
+            self._conn.execute('DELETE FROM responses')
+            self._conn.execute('UPDATE total_size SET size = 0 WHERE id = 0')
+
+    def stats(self):
+        with self._lock:
+            entries, = self._conn.execute(
+                'SELECT COUNT(*) FROM responses').fetchone()
+            size = self._total_size()
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'entries': entries,
+            'size': size,
+        }
+
+
+class LRUCache:
+    """Thread safe in-memory LRU cache of at most `maxsize` values.
+
+    Concurrent `get_or_load` calls for the same key share a single call to
+    the loader.
+    """
+
+    def __init__(self, maxsize=1024, ttl=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._in_flight = {}
+        self._lock = threading.Lock()
+
+    def get_or_load(self, key, loader):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at is None or expires_at > time.monotonic():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+
+            future = self._in_flight.get(key)
+            loading = future is None
+            if loading:
+                future = self._in_flight[key] = Future()
+                self.misses += 1
+            else:
+                self.hits += 1
+
+        if not loading:
+            return future.result()
+
+        try:
+            value = loader()
+        except BaseException as exc:
+            with self._lock:
+                del self._in_flight[key]
+            future.set_exception(exc)
+            raise
+
+        expires_at = None if self.ttl is None else time.monotonic() + self.ttl
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+            del self._in_flight[key]
+        future.set_result(value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'entries': len(self._data),
+            }
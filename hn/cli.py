@@ -0,0 +1,273 @@
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+
+from .api import Client
+from .cache import SQLiteCache
+from .metrics import Metrics
+from .models import Hit, Item, User
+from .ratelimit import RateLimiter
+from .retry import Retry
+
+FILTER_FIELDS = (('created_at', str), ('points', int), ('num_comments', int))
+FILTER_OPERATORS = ('', 'lt', 'lte', 'gt', 'gte')
+POST_TYPES = (
+    'stories', 'comments', 'show_hn', 'ask_hn', 'front_page', 'polls',
+    'pollopt')
+
+
+class Progress:
+    """Reports on stderr how many rows went through, every `interval`."""
+
+    def __init__(self, stream=None, interval=1.0):
+        self.stream = stream or sys.stderr
+        self.interval = interval
+        self.rows = 0
+        self._started_at = self._reported_at = time.monotonic()
+
+    def update(self, rows=1):
+        self.rows += rows
+        now = time.monotonic()
+        if now - self._reported_at >= self.interval:
+            self._reported_at = now
+            self.report(now)
+
+    def report(self, now=None):
+        elapsed = (now or time.monotonic()) - self._started_at
+        self.stream.write('{} rows, {:.1f} rows/s\n'.format(
+            self.rows, self.rows / elapsed if elapsed else 0))
+        self.stream.flush()
+
+
+class JSONLinesOutput:
+    def __init__(self, fp, fields):
+        self._fp = fp
+
+    def write(self, doc):
+        self._fp.write(json.dumps(doc, separators=(',', ':')))
+        self._fp.write('\n')
+
+
+class CSVOutput:
+    def __init__(self, fp, fields):
+        self._writer = csv.writer(fp)
+        self._keys = [key for _, key in fields]
+        self._writer.writerow(self._keys)
+
+    def write(self, doc):
+        self._writer.writerow([
+            json.dumps(value) if isinstance(value, (list, dict)) else value
+            for value in (doc.get(key) for key in self._keys)])
+
+
+OUTPUTS = {'jsonl': JSONLinesOutput, 'csv': CSVOutput}
+
+
+def _add_client_arguments(parser):
+    parser.add_argument(
+        '--concurrency', type=int, default=10,
+        help='number of connections and worker threads')
+    parser.add_argument(
+        '--rate-limit', type=float, metavar='REQUESTS_PER_SECOND')
+    parser.add_argument(
+        '--retries', type=int, default=5,
+        help='retries of failed requests, with exponential backoff')
+    parser.add_argument(
+        '--cache-dir', help='cache responses in a SQLite file in this dir')
+    parser.add_argument(
+        '--metrics', metavar='FILE',
+        help='write request metrics to FILE, in Prometheus text format')
+
+
+def _add_output_arguments(parser):
+    parser.add_argument(
+        '-o', '--output', default='-', help='output file, - for stdout')
+    parser.add_argument(
+        '--format', choices=sorted(OUTPUTS), default='jsonl')
+    parser.add_argument(
+        '--progress', action='store_true',
+        help='report rows and throughput on stderr')
+
+
+def _add_search_arguments(parser):
+    parser.add_argument('-q', '--query', dest='q')
+    parser.add_argument('--author')
+    parser.add_argument('--story-id', type=int)
+    for post_type in POST_TYPES:
+        parser.add_argument(
+            '--' + post_type.replace('_', '-'), action='store_true',
+            default=None)
+    parser.add_argument('--hits-per-page', type=int, default=1000)
+    for field, value_type in FILTER_FIELDS:
+        for operator in FILTER_OPERATORS:
+            name = '__'.join(filter(None, (field, operator)))
+            parser.add_argument(
+                '--' + name.replace('__', '-').replace('_', '-'),
+                dest=name, type=value_type, metavar='VALUE')
+
+
+def _search_params(args):
+    names = ['q', 'author', 'story_id', 'hits_per_page'] + list(POST_TYPES)
+    names += [
+        '__'.join(filter(None, (field, operator)))
+        for field, _ in FILTER_FIELDS for operator in FILTER_OPERATORS]
+    return {
+        name: getattr(args, name) for name in names
+        if getattr(args, name) is not None}
+
+
+def _build_client(args):
+    cache = rate_limiter = None
+    if args.cache_dir:
+        os.makedirs(args.cache_dir, exist_ok=True)
+        cache = SQLiteCache(
+            os.path.join(args.cache_dir, 'hn-cache.db'), ttl=600,
+            stable_after=86400)
+    if args.rate_limit:
+        rate_limiter = RateLimiter(rate=args.rate_limit)
+    return Client(
+        pool_size=args.concurrency, cache=cache, rate_limiter=rate_limiter,
+        retry=Retry(total=args.retries),
+        hooks=Metrics() if args.metrics else None)
+
+
+def _read_keys(path):
+    fp = sys.stdin if path == '-' else open(path)
+    try:
+        for line in fp:
+            line = line.strip()
+            if line and not line.startswith('#'):
+                yield line
+    finally:
+        if fp is not sys.stdin:
+            fp.close()
+
+
+def _write(args, docs, fields):
+    fp = sys.stdout if args.output == '-' else open(
+        args.output, 'w', newline='')
+    progress = Progress() if args.progress else None
+    try:
+        output = OUTPUTS[args.format](fp, fields)
+        for doc in docs:
+            output.write(doc)
+            if progress:
+                progress.update()
+    finally:
+        if fp is not sys.stdout:
+            fp.close()
+        if progress:
+            progress.report()
+
+
+def _search(args, client):
+    params = _search_params(args)
+    if args.parallel:
+        hits = client.parallel_search_by_date(
+            windows=args.concurrency, **params)
+    else:
+        hits = client.search_by_date(prefetch=args.prefetch, **params)
+    _write(args, hits, Hit.FIELDS)
+
+
+def _fetch_many(args, fetch, fields):
+    errors = []
+
+    def values():
+        for result in fetch(
+                _read_keys(args.ids), max_workers=args.concurrency,
+                ordered=not args.unordered):
+            if result.error is not None:
+                errors.append(result)
+                print('hn: {}: {}'.format(result.key, result.error),
+                      file=sys.stderr)
+            elif result.value is not None:
+                yield result.value
+
+    _write(args, values(), fields)
+    return 1 if errors else 0
+
+
+def _items(args, client):
+    return _fetch_many(args, client.get_items, Item.FIELDS)
+
+
+def _users(args, client):
+    return _fetch_many(args, client.get_users, User.FIELDS)
+
+
+def _export(args, client):
+    from .export import export
+
+    manifest = export(
+        args.directory, format=args.format,
+        compression=None if args.compression == 'none' else args.compression,
+        rows_per_file=args.rows_per_file, client=client,
+        **_search_params(args))
+    print('Exported {} rows to {} files'.format(
+        manifest['rows'], len(manifest['files'])), file=sys.stderr)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog='hn', description='Hacker News Search API client')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    search = commands.add_parser(
+        'search', help='search by date, newest first')
+    _add_search_arguments(search)
+    _add_output_arguments(search)
+    _add_client_arguments(search)
+    search.add_argument(
+        '--parallel', action='store_true',
+        help='crawl --concurrency date windows at once (unordered)')
+    search.add_argument(
+        '--prefetch', type=int, default=0,
+        help='pages to fetch ahead of the output')
+    search.set_defaults(func=_search)
+
+    for name, func, description in (
+            ('items', _items, 'fetch items by id'),
+            ('users', _users, 'fetch users by username')):
+        command = commands.add_parser(name, help=description)
+        command.add_argument(
+            'ids', help='file with one id per line, - for stdin')
+        command.add_argument(
+            '--unordered', action='store_true',
+            help='output results as soon as they are fetched')
+        _add_output_arguments(command)
+        _add_client_arguments(command)
+        command.set_defaults(func=func)
+
+    export = commands.add_parser(
+        'export', help='dump search results to JSONL or Parquet files')
+    export.add_argument('directory')
+    export.add_argument(
+        '--format', choices=('jsonl', 'parquet'), default='jsonl')
+    export.add_argument(
+        '--compression', default='gzip',
+        help="gzip or none for JSONL, any Parquet codec for Parquet")
+    export.add_argument('--rows-per-file', type=int, default=1000000)
+    _add_search_arguments(export)
+    _add_client_arguments(export)
+    export.set_defaults(func=_export)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    client = _build_client(args)
+    try:
+        return args.func(args, client) or 0
+    except ValueError as error:
+        print('hn: error: {}'.format(error), file=sys.stderr)
+        return 2
+    except KeyboardInterrupt:
+        return 130
+    finally:
+        if args.metrics:
+            with open(args.metrics, 'w') as fp:
+                fp.write(client.hooks.to_prometheus())
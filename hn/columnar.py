@@ -0,0 +1,104 @@
+import sys
+from array import array
+
+
+class Dictionary:
+    """Maps values to consecutive integer codes, shared between batches."""
+
+    def __init__(self):
+        self.values = []
+        self._codes = {}
+
+    def encode(self, value):
+        code = self._codes.get(value)
+        if code is None:
+            code = self._codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+
+class HitBatch:
+    """Columns of a group of hits, stored in typed arrays.
+
+    Integer columns are int64 with a validity mask (`None` values are stored
+    as 0). `author` is dictionary encoded: `author_codes` index into
+    `authors.values`, -1 meaning no author. `tags` holds tuples of interned
+    tag names.
+    """
+
+    INT_COLUMNS = (
+        ('object_id', 'objectID'),
+        ('created_at_i', 'created_at_i'),
+        ('points', 'points'),
+        ('num_comments', 'num_comments'),
+        ('story_id', 'story_id'),
+        ('parent_id', 'parent_id'),
+    )
+
+    def __init__(self, authors=None):
+        self.authors = authors if authors is not None else Dictionary()
+        self.columns = {name: array('q') for name, _ in self.INT_COLUMNS}
+        self.valid = {name: bytearray() for name, _ in self.INT_COLUMNS}
+        self.author_codes = array('i')
+        self.tags = []
+
+    def __len__(self):
+        return len(self.author_codes)
+
+    def append(self, hit):
+        for name, key in self.INT_COLUMNS:
+            value = hit.get(key)
+            self.valid[name].append(value is not None)
+            self.columns[name].append(0 if value is None else int(value))
+        author = hit.get('author')
+        self.author_codes.append(
+            -1 if author is None else self.authors.encode(author))
+        self.tags.append(
+            tuple(sys.intern(tag) for tag in hit.get('_tags', ())))
+
+    def extend(self, hits):
+        for hit in hits:
+            self.append(hit)
+
+    def to_numpy(self):
+        """Return a dict of NumPy arrays, masked where values are null.
+
+        `author` holds the codes and `author_dictionary` the authors.
+        """
+        import numpy as np
+
+        columns = {}
+        for name, _ in self.INT_COLUMNS:
+            values = np.frombuffer(self.columns[name], dtype=np.int64)
+            valid = np.frombuffer(bytes(self.valid[name]), dtype=np.bool_)
+            if valid.all():
+                columns[name] = values.copy()
+            else:
+                columns[name] = np.ma.MaskedArray(values.copy(), mask=~valid)
+        columns['author'] = np.frombuffer(
+            self.author_codes, dtype=np.int32).copy()
+        columns['author_dictionary'] = np.array(
+            self.authors.values, dtype=object)
+        columns['tags'] = np.empty(len(self.tags), dtype=object)
+        for position, tags in enumerate(self.tags):
+            columns['tags'][position] = tags
+        return columns
+
+    def to_arrow(self):
+        import numpy as np
+        import pyarrow as pa
+
+        arrays, names = [], []
+        for name, _ in self.INT_COLUMNS:
+            values = np.frombuffer(self.columns[name], dtype=np.int64)
+            valid = np.frombuffer(bytes(self.valid[name]), dtype=np.bool_)
+            arrays.append(pa.array(values, type=pa.int64(), mask=~valid))
+            names.append(name)
+        codes = np.frombuffer(self.author_codes, dtype=np.int32)
+        arrays.append(pa.DictionaryArray.from_arrays(
+            pa.array(codes, mask=codes < 0),
+            pa.array(self.authors.values, type=pa.string())))
+        names.append('author')
+        arrays.append(pa.array(self.tags, type=pa.list_(pa.string())))
+        names.append('tags')
+        return pa.RecordBatch.from_arrays(arrays, names=names)
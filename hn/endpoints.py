@@ -2,6 +2,10 @@ from urllib.parse import urljoin
 
 BASE_API_URL = 'https://hn.algolia.com/api/v1/'
 
-SEARCH_BY_DATE = urljoin(BASE_API_URL, 'search_by_date')
-ITEMS = urljoin(BASE_API_URL, 'items/{id}')
-USERS = urljoin(BASE_API_URL, 'users/{id}')
+SEARCH_BY_DATE_PATH = 'search_by_date'
+ITEMS_PATH = 'items/{id}'
+USERS_PATH = 'users/{id}'
+
+SEARCH_BY_DATE = urljoin(BASE_API_URL, SEARCH_BY_DATE_PATH)
+ITEMS = urljoin(BASE_API_URL, ITEMS_PATH)
+USERS = urljoin(BASE_API_URL, USERS_PATH)
@@ -0,0 +1,147 @@
+import gzip
+import json
+import os
+
+from .api import get_default_client
+from .utils import atomic_write_json
+
+MANIFEST_NAME = 'manifest.json'
+
+
+class JSONLinesWriter:
+    def __init__(self, path, compression=None):
+        if compression == 'gzip':
+            self._fp = gzip.open(path, 'wt', encoding='utf-8')
+        elif compression is None:
+            self._fp = open(path, 'w', encoding='utf-8')
+        else:
+            raise ValueError(
+                'Unsupported compression {!r}'.format(compression))
+
+    def write(self, hit):
+        self._fp.write(json.dumps(hit, separators=(',', ':')))
+        self._fp.write('\n')
+
+    def close(self):
+        self._fp.close()
+
+
+class ParquetWriter:
+    """Writes hits in row groups of `row_group_size`, with a fixed schema."""
+
+    def __init__(self, path, compression=None, row_group_size=50000):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        string, int64 = pa.string(), pa.int64()
+        self._schema = pa.schema([
+            ('objectID', string),
+            ('created_at_i', int64),
+            ('author', string),
+            ('title', string),
+            ('url', string),
+            ('points', int64),
+            ('num_comments', int64),
+            ('story_id', int64),
+            ('story_title', string),
+            ('story_url', string),
+            ('parent_id', int64),
+            ('story_text', string),
+            ('comment_text', string),
+            ('_tags', pa.list_(string)),
+        ])
+        self._pa = pa
+        self._writer = pq.ParquetWriter(
+            path, self._schema, compression=compression or 'none')
+        self._row_group_size = row_group_size
+        self._rows = []
+
+    def write(self, hit):
+        self._rows.append(hit)
+        if len(self._rows) >= self._row_group_size:
+            self._flush()
+
+    def _flush(self):
+        if self._rows:
+            self._writer.write_table(self._pa.Table.from_pylist(
+                self._rows, schema=self._schema))
+            self._rows = []
+
+    def close(self):
+        self._flush()
+        self._writer.close()
+
+
+WRITERS = {
+    'jsonl': (JSONLinesWriter, '.jsonl'),
+    'parquet': (ParquetWriter, '.parquet'),
+}
+
+
+def export(directory, format='jsonl', compression='gzip',
+           rows_per_file=1000000, client=None, **search_params):
+    """Dump the hits of `search_by_date(**search_params)` to `directory`.
+
+    Hits are written to files of up to `rows_per_file` rows, which are
+    renamed to their final name once complete. `manifest.json` lists them
+    along with the cursor to resume from, so running the same export again
+    continues where it stopped. Returns the manifest.
+    """
+    if format not in WRITERS:
+        raise ValueError('Unsupported format {!r}'.format(format))
+    Writer, extension = WRITERS[format]
+    if format == 'jsonl' and compression == 'gzip':
+        extension += '.gz'
+
+    os.makedirs(directory, exist_ok=True)
+    manifest_path = os.path.join(directory, MANIFEST_NAME)
+    query = {key: str(value) for key, value in search_params.items()}
+    manifest = {
+        'format': format,
+        'compression': compression,
+        'query': query,
+        'files': [],
+        'rows': 0,
+        'cursor': None,
+        'complete': False,
+    }
+    if os.path.exists(manifest_path):
+        with open(manifest_path) as fp:
+            manifest = json.load(fp)
+        if ((manifest['query'], manifest['format'], manifest['compression'])
+                != (query, format, compression)):
+            raise ValueError(
+                '{} holds an export of a different query or format'.format(
+                    directory))
+        if manifest['complete']:
+            return manifest
+
+    client = client or get_default_client()
+    results = client.search_by_date(cursor=manifest['cursor'], **search_params)
+
+    while True:
+        name = 'part-{:05d}{}'.format(len(manifest['files']), extension)
+        path = os.path.join(directory, name)
+        tmp_path = path + '.tmp'
+        writer = Writer(tmp_path, compression=compression)
+        rows = 0
+        try:
+            for hit in results:
+                writer.write(hit)
+                rows += 1
+                if rows >= rows_per_file:
+                    break
+        finally:
+            writer.close()
+
+        if rows:
+            os.replace(tmp_path, path)
+            manifest['files'].append({'name': name, 'rows': rows})
+            manifest['rows'] += rows
+            manifest['cursor'] = results.cursor.dumps()
+        else:
+            os.unlink(tmp_path)
+        manifest['complete'] = rows < rows_per_file
+        atomic_write_json(manifest_path, manifest)
+        if manifest['complete']:
+            return manifest
@@ -0,0 +1,220 @@
+import bisect
+import threading
+from collections import defaultdict
+
+DEFAULT_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Hooks:
+    """Receives the events of a `Client`.
+
+    Every method is a no-op; subclass it and override the events you need.
+    `elapsed` times are in seconds.
+    """
+
+    def on_request(self, endpoint, url, params):
+        pass
+
+    def on_response(self, endpoint, status_code, elapsed, size):
+        """`size` is the body size in bytes, None if it's streamed."""
+
+    def on_error(self, endpoint, exception, elapsed):
+        pass
+
+    def on_retry(self, endpoint, attempt, delay, reason):
+        """`reason` is the status code or the exception class name."""
+
+    def on_cache(self, endpoint, hit):
+        pass
+
+    def on_decode(self, endpoint, elapsed, processing_time_ms=None,
+                  nb_hits=None):
+        """`processing_time_ms` and `nb_hits` are reported by Algolia."""
+
+    def on_page(self, hits, elapsed):
+        """A search page was consumed: `hits` new hits were yielded over
+        `elapsed` seconds, mostly waiting for the consumer."""
+
+
+class Callback(Hooks):
+    """Calls `function(event, fields)` for every event, for example
+    `Callback(lambda event, fields: print(event, fields))`."""
+
+    def __init__(self, function):
+        self.function = function
+
+    def on_request(self, endpoint, url, params):
+        self.function('request', {
+            'endpoint': endpoint, 'url': url, 'params': params})
+
+    def on_response(self, endpoint, status_code, elapsed, size):
+        self.function('response', {
+            'endpoint': endpoint, 'status_code': status_code,
+            'elapsed': elapsed, 'size': size})
+
+    def on_error(self, endpoint, exception, elapsed):
+        self.function('error', {
+            'endpoint': endpoint, 'exception': exception, 'elapsed': elapsed})
+
+    def on_retry(self, endpoint, attempt, delay, reason):
+        self.function('retry', {
+            'endpoint': endpoint, 'attempt': attempt, 'delay': delay,
+            'reason': reason})
+
+    def on_cache(self, endpoint, hit):
+        self.function('cache', {'endpoint': endpoint, 'hit': hit})
+
+    def on_decode(self, endpoint, elapsed, processing_time_ms=None,
+                  nb_hits=None):
+        self.function('decode', {
+            'endpoint': endpoint, 'elapsed': elapsed,
+            'processing_time_ms': processing_time_ms, 'nb_hits': nb_hits})
+
+    def on_page(self, hits, elapsed):
+        self.function('page', {'hits': hits, 'elapsed': elapsed})
+
+
+class Histogram:
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def cumulative_counts(self):
+        total = 0
+        for bound, count in zip(self.buckets + (float('inf'),), self.counts):
+            total += count
+            yield bound, total
+
+
+class Metrics(Hooks):
+    """Aggregates `Client` events into counters and histograms.
+
+    `snapshot()` returns them as a dict, `to_prometheus()` in Prometheus'
+    text format (which OpenTelemetry collectors can scrape as well).
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.counters = defaultdict(float)
+            self.gauges = defaultdict(float)
+            self.histograms = defaultdict(
+                lambda: Histogram(self.buckets))
+
+    def _inc(self, name, labels=(), value=1):
+        self.counters[name, labels] += value
+
+    def on_request(self, endpoint, url, params):
+        with self._lock:
+            self.gauges['requests_in_flight', ()] += 1
+
+    def on_response(self, endpoint, status_code, elapsed, size):
+        labels = (('endpoint', endpoint),)
+        with self._lock:
+            self.gauges['requests_in_flight', ()] -= 1
+            self._inc('requests_total', labels + (
+                ('status', str(status_code)),))
+            if size is not None:
+                self._inc('response_bytes_total', labels, size)
+            self.histograms['request_seconds', labels].observe(elapsed)
+
+    def on_error(self, endpoint, exception, elapsed):
+        with self._lock:
+            self.gauges['requests_in_flight', ()] -= 1
+            self._inc('request_errors_total', (
+                ('endpoint', endpoint),
+                ('error', type(exception).__name__)))
+
+    def on_retry(self, endpoint, attempt, delay, reason):
+        with self._lock:
+            self._inc('retries_total', (
+                ('endpoint', endpoint), ('reason', str(reason))))
+            self._inc('retry_wait_seconds_total', (), delay)
+
+    def on_cache(self, endpoint, hit):
+        name = 'cache_hits_total' if hit else 'cache_misses_total'
+        with self._lock:
+            self._inc(name, (('endpoint', endpoint),))
+
+    def on_decode(self, endpoint, elapsed, processing_time_ms=None,
+                  nb_hits=None):
+        labels = (('endpoint', endpoint),)
+        with self._lock:
+            self.histograms['decode_seconds', labels].observe(elapsed)
+            if processing_time_ms is not None:
+                self.histograms['processing_seconds', labels].observe(
+                    processing_time_ms / 1000)
+            if nb_hits is not None:
+                self.gauges['last_nb_hits', ()] = nb_hits
+
+    def on_page(self, hits, elapsed):
+        with self._lock:
+            self._inc('hits_total', (), hits)
+            self.histograms['page_consume_seconds', ()].observe(elapsed)
+
+    def snapshot(self):
+        def key(name, labels):
+            if not labels:
+                return name
+            return '{}{{{}}}'.format(name, ','.join(
+                '{}={}'.format(*label) for label in labels))
+
+        with self._lock:
+            doc = {key(*k): v for k, v in self.counters.items()}
+            doc.update((key(*k), v) for k, v in self.gauges.items())
+            for (name, labels), histogram in self.histograms.items():
+                doc[key(name + '_count', labels)] = histogram.count
+                doc[key(name + '_sum', labels)] = histogram.sum
+        return doc
+
+    def to_prometheus(self, prefix='hn_'):
+        def sample(name, labels, value):
+            if labels:
+                name += '{{{}}}'.format(','.join(
+                    '{}="{}"'.format(*label) for label in labels))
+            return '{} {}'.format(name, _format_value(value))
+
+        lines = []
+        with self._lock:
+            metrics = [
+                ('counter', self.counters), ('gauge', self.gauges)]
+            for kind, values in metrics:
+                for name in sorted({name for name, _ in values}):
+                    lines.append('# TYPE {}{} {}'.format(prefix, name, kind))
+                    for (other, labels), value in sorted(values.items()):
+                        if other == name:
+                            lines.append(sample(prefix + name, labels, value))
+            for name in sorted({name for name, _ in self.histograms}):
+                lines.append('# TYPE {}{} histogram'.format(prefix, name))
+                for (other, labels), histogram in sorted(
+                        self.histograms.items(), key=lambda item: item[0]):
+                    if other != name:
+                        continue
+                    for bound, count in histogram.cumulative_counts():
+                        le = '+Inf' if bound == float('inf') else str(bound)
+                        lines.append(sample(
+                            prefix + name + '_bucket',
+                            labels + (('le', le),), count))
+                    lines.append(sample(
+                        prefix + name + '_sum', labels, histogram.sum))
+                    lines.append(sample(
+                        prefix + name + '_count', labels, histogram.count))
+        return '\n'.join(lines) + '\n'
+
+
+def _format_value(value):
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
@@ -1,5 +1,9 @@
+import functools
+import operator
+import sys
 from collections import namedtuple
 from calendar import timegm
+from datetime import datetime, timezone
 
 from . import utils
 
@@ -11,6 +15,33 @@ class Comparable:
     def __ne__(self, other):
         return not (self == other)
 
+    def __hash__(self):
+        return hash((self.__class__, self._get_value()))
+
+
+class Query(Comparable):
+    """Base of tags, filters and their combinations.
+
+    They are immutable: attributes can't be reassigned once set, so hashes
+    and rendered query strings are computed only once.
+    """
+
+    def __setattr__(self, name, value):
+        if name in self.__dict__:
+            raise AttributeError(
+                "{} can't be modified".format(self.__class__.__name__))
+        object.__setattr__(self, name, value)
+
+    def __str__(self):
+        rendered = self.__dict__.get('_rendered')
+        if rendered is None:
+            rendered = self._render()
+            object.__setattr__(self, '_rendered', rendered)
+        return rendered
+
+    def _render(self):
+        raise NotImplementedError()
+
 
 class BooleanOperable:
     def __and__(self, other):
@@ -20,34 +51,170 @@ class BooleanOperable:
         return Or(self, other)
 
 
-class BaseBooleanOperator(Comparable):
+class Predicate:
+    """Compiled form of a tag or filter expression.
+
+    Calling it with a hit dict tells whether the hit matches. `mask` evaluates
+    it over columns (a `HitBatch` or the dict returned by `to_numpy`) and
+    returns a NumPy boolean array.
+    """
+
+    def __init__(self, function, vectorized):
+        self._function = function
+        self._vectorized = vectorized
+
+    def __call__(self, hit):
+        return self._function(hit)
+
+    def filter(self, hits):
+        return (hit for hit in hits if self._function(hit))
+
+    def mask(self, columns):
+        if hasattr(columns, 'to_numpy'):
+            columns = columns.to_numpy()
+        return self._vectorized(columns)
+
+
+def _filled(mask):
+    import numpy as np
+    return np.ma.filled(mask, False)
+
+
+class BaseBooleanOperator(Query):
     def __init__(self, left, right):
-        self.left = left
-        self.right = right
+        # Operands are hashed already: deep trees hash in constant time.
+        self.__dict__.update(
+            left=left, right=right,
+            _hash=hash((self.__class__, left, right)))
+
+    def __hash__(self):
+        return self._hash
+
+    def __eq__(self, other):
+        pairs = [(self, other)]
+        while pairs:
+            left, right = pairs.pop()
+            if left is right:
+                continue
+            if not isinstance(left, BaseBooleanOperator):
+                if left != right:
+                    return False
+            elif left.__class__ != right.__class__ or (
+                    left._hash != right._hash):
+                return False
+            else:
+                pairs.append((left.left, right.left))
+                pairs.append((left.right, right.right))
+        return True
 
     def _get_value(self):
         return (self.left, self.right)
 
+    def operands(self):
+        """Operands of the chain of this operator, left to right.
+
+        `Or(Or(a, b), c)` and `Or(a, Or(b, c))` both give `[a, b, c]`.
+        """
+        operands = []
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            if node.__class__ is self.__class__:
+                stack.extend((node.right, node.left))
+            else:
+                operands.append(node)
+        return operands
+
+    def _render(self):
+        # Iterative, so that trees of thousands of tags render in linear time
+        # without hitting the recursion limit.
+        parts = []
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            if isinstance(node, str):
+                parts.append(node)
+            elif '_rendered' in node.__dict__ or not isinstance(
+                    node, BaseBooleanOperator):
+                parts.append(str(node))
+            elif isinstance(node, And):
+                stack.extend((node.right, ',', node.left))
+            else:
+                # Nested ORs on the left are flattened into a single group.
+                operands = []
+                while isinstance(node, Or):
+                    operands.append(node.right)
+                    node = node.left
+                operands.append(node)
+                stack.append(')')
+                for i, operand in enumerate(operands):
+                    if i:
+                        stack.append(',')
+                    stack.append(operand)
+                stack.append('(')
+        return ''.join(parts)
+
     def __repr__(self):
-        return "{clazz}({left!r}, {right!r})".format(
-            clazz=self.__class__.__name__, left=self.left, right=self.right)
+        parts = []
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            if isinstance(node, str):
+                parts.append(node)
+            elif isinstance(node, BaseBooleanOperator):
+                stack.extend((
+                    ')', node.right, ', ', node.left,
+                    node.__class__.__name__ + '('))
+            else:
+                parts.append(repr(node))
+        return ''.join(parts)
 
 
 class And(BaseBooleanOperator, BooleanOperable):
-    def __str__(self):
-        return "{},{}".format(self.left, self.right)
+    def compile(self):
+        predicates = [operand.compile() for operand in self.operands()]
+
+        def mask(columns):
+            import numpy as np
+            return np.logical_and.reduce([
+                predicate.mask(columns) for predicate in predicates])
+        return Predicate(
+            lambda hit: all(predicate(hit) for predicate in predicates),
+            mask)
+
 
 class Or(BaseBooleanOperator, BooleanOperable):
-    def __str__(self):
-        left = str(self.left)
-        if self.left.__class__ == Or:
-            left = str(left).rstrip(')').lstrip('(')
-        return "({},{})".format(left, self.right)
+    def compile(self):
+        # Tags are matched all at once, against a set.
+        tags, predicates = {}, []
+        for operand in self.operands():
+            if isinstance(operand, Tag):
+                tags.setdefault(operand.__class__, []).append(operand)
+            else:
+                predicates.append(operand.compile())
+        values = frozenset(
+            str(tag) for group in tags.values() for tag in group)
+
+        def matches(hit):
+            return (not values.isdisjoint(hit.get('_tags', ())) or
+                    any(predicate(hit) for predicate in predicates))
+
+        def mask(columns):
+            import numpy as np
+            masks = [
+                cls._mask_any(group, columns) for cls, group in tags.items()]
+            masks.extend(predicate.mask(columns) for predicate in predicates)
+            return np.logical_or.reduce(masks)
+        return Predicate(matches, mask)
 
 
-class Tag(BooleanOperable, Comparable):
+class Tag(BooleanOperable, Query):
     def __init__(self, value):
-        self.value = value
+        self.__dict__['value'] = value
+        self.__dict__['_hash'] = hash((self.__class__, self._get_value()))
+
+    def __hash__(self):
+        return self._hash
 
     def _get_value(self):
         return self.value
@@ -55,12 +222,30 @@ class Tag(BooleanOperable, Comparable):
     def __repr__(self):
         return "{}({})".format(self.__class__.__name__, self.value)
 
-    def __str__(self):
+    def _render(self):
         if getattr(self, 'PREFIX', None):
             return '{}_{}'.format(self.PREFIX, self.value)
 
         return self.value
 
+    def compile(self):
+        tag = str(self)
+        return Predicate(
+            lambda hit: tag in hit.get('_tags', ()),
+            lambda columns: self._mask_any([self], columns))
+
+    @classmethod
+    def _mask_any(cls, tags, columns):
+        """Mask of the hits tagged with any of `tags`, instances of `cls`."""
+        import numpy as np
+        if 'tags' not in columns:
+            raise ValueError(
+                "Can't evaluate {!r} without a tags column".format(tags[0]))
+        values = frozenset(str(tag) for tag in tags)
+        return np.fromiter(
+            (not values.isdisjoint(hit_tags) for hit_tags in columns['tags']),
+            dtype=np.bool_, count=len(columns['tags']))
+
 
 class PostType(Tag):
     pass
@@ -69,6 +254,16 @@ class PostType(Tag):
 class Author(Tag):
     PREFIX = 'author'
 
+    @classmethod
+    def _mask_any(cls, tags, columns):
+        import numpy as np
+        if 'author_dictionary' not in columns:
+            return super()._mask_any(tags, columns)
+        values = frozenset(tag.value for tag in tags)
+        codes = [code for code, author in enumerate(
+            columns['author_dictionary']) if author in values]
+        return np.isin(columns['author'], codes)
+
 
 class StoryID(Tag):
     PREFIX = 'story'
@@ -76,6 +271,16 @@ class StoryID(Tag):
     def _get_value(self):
         return str(self.value)
 
+    @classmethod
+    def _mask_any(cls, tags, columns):
+        import numpy as np
+        if 'story_id' not in columns:
+            return super()._mask_any(tags, columns)
+        # Stories are tagged with their own id, the rest with their story's.
+        story_ids = [int(tag.value) for tag in tags]
+        return (_filled(np.ma.isin(columns['story_id'], story_ids)) |
+                _filled(np.ma.isin(columns['object_id'], story_ids)))
+
 
 FilterOperator = namedtuple('FilterOperator', ['name', 'operator'])
 
@@ -93,7 +298,16 @@ OPERATOR_ALIASES = {
 }
 
 
-class Filter(Comparable):
+COMPARISONS = {
+    EQUALS_OPERATOR: operator.eq,
+    LESS_OPERATOR: operator.lt,
+    LESS_EQUALS_OPERATOR: operator.le,
+    GREATER_OPERATOR: operator.gt,
+    GREATER_EQUALS_OPERATOR: operator.ge,
+}
+
+
+class Filter(Query):
     FILTER_PREFIX = None
 
     def __init__(self, value, operator):
@@ -153,13 +367,28 @@ class Filter(Comparable):
     def get_value(self):
         return self.value
 
-    def __str__(self):
+    def _render(self):
         field_name = getattr(self, 'FIELD_NAME', self.FILTER_PREFIX)
         return "{field_name}{operator}{value}".format(
             field_name=field_name,
             operator=self.operator.operator,
             value=self.get_value())
 
+    def get_numeric_value(self):
+        return self.value
+
+    def compile(self):
+        field_name = getattr(self, 'FIELD_NAME', self.FILTER_PREFIX)
+        compare = COMPARISONS[self.operator]
+        value = self.get_numeric_value()
+
+        def matches(hit):
+            field_value = hit.get(field_name)
+            return field_value is not None and compare(field_value, value)
+        return Predicate(
+            matches, lambda columns: _filled(
+                compare(columns[field_name], value)))
+
 
 class NumericFilter(Filter):
     @classmethod
@@ -171,12 +400,19 @@ class CreatedAtFilter(Filter):
     FILTER_PREFIX = 'created_at'
     FIELD_NAME = 'created_at_i'
 
+    def __init__(self, value, operator):
+        super().__init__(value, operator)
+        self.timestamp = timegm(value.timetuple())
+
     @classmethod
     def parse_value(cls, value):
         return utils.parse_date(value)
 
     def get_value(self):
-        return str(timegm(self.value.timetuple()))
+        return str(self.timestamp)
+
+    def get_numeric_value(self):
+        return self.timestamp
 
 
 class PointsFilter(NumericFilter):
@@ -187,15 +423,25 @@ class NumCommentsFilter(NumericFilter):
     FILTER_PREFIX = 'num_comments'
 
 
-class FilterParser:
+class FilterParser(Query):
     REGISTERED_FILTER_CLASSES = [
         CreatedAtFilter, PointsFilter, NumCommentsFilter
     ]
 
     def __init__(self, filters):
+        filters = tuple(filters)
         if len(filters) != len(set(filters)):
             raise ValueError('Repeated filters found')
         self._filters = filters
+        self._hash = hash((self.__class__, filters))
+        # Cache of `replace_str` templates, by kind of filter replaced.
+        self._templates = {}
+
+    def __hash__(self):
+        return self._hash
+
+    def _get_value(self):
+        return self._filters
 
     def replace(self, **new_filter):
         if len(new_filter) != 1:
@@ -237,5 +483,159 @@ class FilterParser:
             _filters.append(filter)
         return cls(_filters)
 
-    def __str__(self):
+    def replace_str(self, **new_filter):
+        """Same as `str(self.replace(**new_filter))`.
+
+        The rest of the filters are rendered once per kind of filter being
+        replaced, which is what happens on every page of a search.
+        """
+        if len(new_filter) != 1:
+            raise ValueError("Can replace only 1 filter at a time")
+        filter_name, value = next(iter(new_filter.items()))
+        new_filter = self._parse_from_list(filter_name, value)
+
+        key = (new_filter.__class__, new_filter.operator)
+        template = self._templates.get(key)
+        if template is None:
+            kept = [
+                None if filter.mutually_exclusive(new_filter) else str(filter)
+                for filter in self._filters]
+            if kept.count(None) > 1:
+                # Replacing would repeat the new filter, let it raise.
+                return str(self.replace(**{filter_name: value}))
+            if None not in kept:
+                kept.append(None)
+            slot = kept.index(None)
+            template = (
+                ','.join(kept[:slot] + ['']),
+                ','.join([''] + kept[slot + 1:]))
+            self._templates[key] = template
+        return template[0] + str(new_filter) + template[1]
+
+    def _render(self):
         return ','.join([str(f) for f in self._filters])
+
+    def compile(self):
+        if not self._filters:
+            def mask(columns):
+                import numpy as np
+                return np.ones(len(columns['object_id']), dtype=np.bool_)
+            return Predicate(lambda hit: True, mask)
+        return functools.reduce(
+            And, self._filters[1:], self._filters[0]).compile()
+
+
+def _intern(value):
+    return sys.intern(value)
+
+
+def _intern_all(values):
+    return tuple(sys.intern(value) for value in values)
+
+
+class Record:
+    """Compact, read-only view of an API document.
+
+    `FIELDS` are `(attribute, key)` pairs; `CONVERTERS` maps attributes to
+    functions applied to their (non null) values.
+    """
+    __slots__ = ()
+    FIELDS = ()
+    CONVERTERS = {}
+
+    @classmethod
+    def from_dict(cls, doc):
+        record = cls.__new__(cls)
+        for name, key in cls.FIELDS:
+            value = doc.get(key)
+            converter = cls.CONVERTERS.get(name)
+            if converter is not None and value is not None:
+                value = converter(value)
+            setattr(record, name, value)
+        return record
+
+    def to_dict(self):
+        return {key: getattr(self, name) for name, key in self.FIELDS}
+
+    @property
+    def created_at(self):
+        return datetime.fromtimestamp(
+            self.created_at_i, timezone.utc).replace(tzinfo=None)
+
+    def __eq__(self, other):
+        return (self.__class__ == other.__class__ and
+                self.to_dict() == other.to_dict())
+
+    def __ne__(self, other):
+        return not (self == other)
+
+    def __repr__(self):
+        return '{}({})'.format(self.__class__.__name__, ', '.join(
+            '{}={!r}'.format(name, getattr(self, name))
+            for name in self.__slots__[:3]))
+
+
+class Hit(Record):
+    __slots__ = (
+        'object_id', 'created_at_i', 'author', 'title', 'url', 'points',
+        'num_comments', 'story_id', 'story_title', 'story_url', 'parent_id',
+        'story_text', 'comment_text', 'tags')
+    FIELDS = (
+        ('object_id', 'objectID'),
+        ('created_at_i', 'created_at_i'),
+        ('author', 'author'),
+        ('title', 'title'),
+        ('url', 'url'),
+        ('points', 'points'),
+        ('num_comments', 'num_comments'),
+        ('story_id', 'story_id'),
+        ('story_title', 'story_title'),
+        ('story_url', 'story_url'),
+        ('parent_id', 'parent_id'),
+        ('story_text', 'story_text'),
+        ('comment_text', 'comment_text'),
+        ('tags', '_tags'),
+    )
+    CONVERTERS = {
+        'created_at_i': int,
+        'author': _intern,
+        'tags': _intern_all,
+    }
+
+
+class Item(Record):
+    __slots__ = (
+        'id', 'created_at_i', 'type', 'author', 'title', 'url', 'text',
+        'points', 'parent_id', 'story_id', 'options', 'children')
+    FIELDS = tuple(zip(__slots__, __slots__))
+    CONVERTERS = {
+        'created_at_i': int,
+        'type': _intern,
+        'author': _intern,
+        'options': tuple,
+        'children': lambda children: tuple(
+            Item.from_dict(child) for child in children),
+    }
+
+    def to_dict(self):
+        doc = super().to_dict()
+        if self.children is not None:
+            doc['children'] = [child.to_dict() for child in self.children]
+        return doc
+
+
+class User(Record):
+    __slots__ = (
+        'username', 'created_at_i', 'karma', 'about', 'submission_count',
+        'comment_count')
+    FIELDS = tuple(zip(__slots__, __slots__))
+    CONVERTERS = {
+        'created_at_i': int,
+        'username': _intern,
+    }
+
+
+def to_result_type(doc, result_type=dict):
+    if result_type is dict or doc is None:
+        return doc
+    return result_type.from_dict(doc)
@@ -0,0 +1,216 @@
+import base64
+import contextlib
+import itertools
+import json
+import time
+
+from .columnar import Dictionary, HitBatch
+from .models import FilterParser, to_result_type
+from .utils import fan_in, put_pages
+
+_NO_FILTERS = FilterParser(())
+
+# Algolia returns at most this many hits per page, whatever is asked for.
+MAX_HITS_PER_PAGE = 1000
+
+
+class SearchCursor:
+    """Position of a `search_by_date` crawl.
+
+    Pages are requested with `created_at_i<=created_at_i`, skipping the hits
+    of that same second that were already yielded (`seen`), so hits sharing a
+    timestamp are never lost. It can be serialized with `dumps` and passed
+    back to `search_by_date(cursor=...)` to resume a crawl.
+    """
+
+    VERSION = 1
+
+    def __init__(self, created_at_i=None, seen=()):
+        self.created_at_i = created_at_i
+        self.seen = set(seen)
+
+    def __eq__(self, other):
+        return (self.__class__ == other.__class__ and
+                self.created_at_i == other.created_at_i and
+                self.seen == other.seen)
+
+    def __repr__(self):
+        return '{}({!r}, {!r})'.format(
+            self.__class__.__name__, self.created_at_i, sorted(self.seen))
+
+    def copy(self):
+        return self.__class__(self.created_at_i, self.seen)
+
+    def is_seen(self, hit):
+        return (hit['created_at_i'] == self.created_at_i and
+                hit['objectID'] in self.seen)
+
+    def new_hits(self, hits):
+        return [hit for hit in hits if not self.is_seen(hit)]
+
+    def advance(self, hit):
+        if hit['created_at_i'] != self.created_at_i:
+            self.created_at_i = hit['created_at_i']
+            self.seen = set()
+        self.seen.add(hit['objectID'])
+
+    def request_params(self, params, parser, skip_pages=0):
+        if self.created_at_i is None:
+            return params
+
+        params = dict(params, numericFilters=(
+            parser or _NO_FILTERS).replace_str(
+                created_at__lte=self.created_at_i))
+
+        # Seen hits are the first ones of their second, skip the full pages.
+        page = len(self.seen) // params['hitsPerPage'] + skip_pages
+        if page:
+            params['page'] = page
+        return params
+
+    def dumps(self):
+        doc = {
+            'v': self.VERSION,
+            'created_at_i': self.created_at_i,
+            'seen': sorted(self.seen),
+        }
+        return base64.urlsafe_b64encode(
+            json.dumps(doc, separators=(',', ':')).encode()).decode()
+
+    @classmethod
+    def loads(cls, token):
+        try:
+            doc = json.loads(base64.urlsafe_b64decode(token.encode()))
+        except ValueError:
+            raise ValueError('Invalid cursor')
+        if not isinstance(doc, dict) or doc.get('v') != cls.VERSION:
+            raise ValueError('Invalid cursor')
+        return cls(doc['created_at_i'], doc['seen'])
+
+
+def _to_cursor(cursor):
+    if cursor is None:
+        return SearchCursor()
+    if isinstance(cursor, str):
+        return SearchCursor.loads(cursor)
+    return cursor.copy()
+
+
+class SearchResults:
+    """Iterator over the hits of a `search_by_date` query.
+
+    `cursor` always points right after the last hit returned.
+    """
+
+    def __init__(self, client, params, parser, cursor=None, first_page=None,
+                 stream=False, drop_keys=(), result_type=dict, prefetch=0):
+        self.cursor = _to_cursor(cursor)
+        self._client = client
+        self._params = params
+        self._parser = parser
+        self._first_page = first_page
+        self._stream = stream
+        self._drop_keys = tuple(drop_keys or ())
+        self._result_type = result_type
+        self._prefetch = prefetch
+        if prefetch:
+            self._hits = self._iter_prefetched_hits()
+        else:
+            self._hits = self._iter_hits(self.cursor)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return to_result_type(next(self._hits), self._result_type)
+
+    def batches(self, size=None):
+        """Yield the remaining hits in `HitBatch` columns of `size` hits.
+
+        By default a batch holds as many hits as a page.
+        """
+        size = size or self._params['hitsPerPage']
+        authors = Dictionary()
+        while True:
+            batch = HitBatch(authors)
+            batch.extend(itertools.islice(self._hits, size))
+            if not len(batch):
+                return
+            yield batch
+
+    def _collect(self):
+        batch = HitBatch()
+        batch.extend(self._hits)
+        return batch
+
+    def to_numpy(self):
+        return self._collect().to_numpy()
+
+    def to_arrow(self):
+        import pyarrow as pa
+        return pa.Table.from_batches([self._collect().to_arrow()])
+
+    def _fetch_page(self, cursor, skip_pages):
+        params = cursor.request_params(
+            self._params, self._parser, skip_pages)
+        if self._stream:
+            return self._client._stream_search_page(params)
+        return self._client._get_search_page(params)['hits']
+
+    def _iter_prefetched_hits(self):
+        """Fetch up to `prefetch` pages ahead of the consumer in a thread."""
+        def produce(put, submit):
+            put_pages(
+                self._iter_hits(self.cursor.copy()),
+                self._params['hitsPerPage'], put)
+
+        pages = fan_in([produce], max_workers=1, maxsize=self._prefetch)
+        with contextlib.closing(pages):
+            for page in pages:
+                for hit in page:
+                    self.cursor.advance(hit)
+                    yield hit
+
+    def _iter_hits(self, cursor):
+        retry, hooks = self._client.retry, self._client.hooks
+        page_size = min(self._params['hitsPerPage'], MAX_HITS_PER_PAGE)
+        hits = self._first_page['hits'] if self._first_page else None
+        skip_pages = 0
+        attempt = 0
+        while True:
+            if hits is None:
+                hits = self._fetch_page(cursor, skip_pages)
+            started_at = time.monotonic()
+            received = new = 0
+            try:
+                for hit in hits:
+                    received += 1
+                    if cursor.is_seen(hit):
+                        continue
+                    new += 1
+                    for key in self._drop_keys:
+                        hit.pop(key, None)
+                    cursor.advance(hit)
+                    yield hit
+            except Exception as exc:
+                # A streamed page broke midway, request it again from the
+                # cursor: hits already yielded are skipped. Failed requests
+                # were already retried by the client, they don't get here.
+                if retry is None or not retry.is_retryable(
+                        attempt, exception=exc):
+                    raise
+                retry.sleep(attempt)
+                attempt += 1
+                hits = None
+                continue
+            attempt = 0
+            if hooks is not None:
+                hooks.on_page(new, time.monotonic() - started_at)
+            # A short page is the last one: asking for more would only get
+            # the hits of the last second again, then an empty page.
+            if received < page_size:
+                return
+            # Only reachable if same-second hits are returned in a different
+            # order between requests; keep moving forward.
+            skip_pages = 0 if new else skip_pages + 1
+            hits = None
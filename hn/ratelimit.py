@@ -0,0 +1,58 @@
+import threading
+import time
+
+
+class RateLimiter:
+    """Token bucket shared by every request of a `Client`.
+
+    Allows `rate` requests per second with bursts of up to `burst` requests.
+    The rate adapts AIMD style: it grows by `increase` after every successful
+    request (up to `max_rate`) and is multiplied by `decrease` when Algolia
+    throttles us, or when a request takes longer than `target_latency`
+    seconds (down to `min_rate`).
+    """
+
+    def __init__(self, rate=10.0, burst=None, min_rate=0.5, max_rate=None,
+                 increase=0.1, decrease=0.5, target_latency=None):
+        self.rate = float(rate)
+        self.burst = burst or max(1.0, self.rate)
+        self.min_rate = min_rate
+        self.max_rate = max_rate or self.rate
+        self.increase = increase
+        self.decrease = decrease
+        self.target_latency = target_latency
+        self._tokens = self.burst
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self._tokens = min(
+            self.burst, self._tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+
+    def acquire(self):
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            # Tokens can go negative: each caller reserves its slot and
+            # sleeps outside the lock.
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0
+        if wait:
+            time.sleep(wait)
+
+    def on_success(self, latency=None):
+        with self._lock:
+            self._refill(time.monotonic())
+            if self.target_latency is not None and latency is not None and (
+                    latency > self.target_latency):
+                self.rate = max(self.min_rate, self.rate * self.decrease)
+            else:
+                self.rate = min(self.max_rate, self.rate + self.increase)
+
+    def on_throttle(self, retry_after=None):
+        with self._lock:
+            self._refill(time.monotonic())
+            self.rate = max(self.min_rate, self.rate * self.decrease)
+            # Drain the bucket so nobody retries before `retry_after`.
+            self._tokens = min(self._tokens, -(retry_after or 0) * self.rate)
@@ -0,0 +1,47 @@
+import random
+import time
+
+import requests
+
+RETRYABLE_EXCEPTIONS = (
+    requests.ConnectionError,
+    requests.Timeout,
+    requests.exceptions.ChunkedEncodingError,
+)
+
+
+class Retry:
+    """Retry policy for failed requests.
+
+    A request is attempted up to `total + 1` times when it fails with a
+    network error or a status in `status_codes`. The n-th retry waits
+    `backoff_factor * 2 ** n` seconds (capped to `max_backoff`); with `jitter`
+    a random time between 0 and that is used instead. A `Retry-After` header
+    sent by Algolia is always respected.
+    """
+
+    def __init__(self, total=5, backoff_factor=0.5, max_backoff=30,
+                 status_codes=(429, 500, 502, 503, 504), jitter=True):
+        self.total = total
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        self.status_codes = frozenset(status_codes)
+        self.jitter = jitter
+
+    def is_retryable(self, attempt, exception=None, status_code=None):
+        if attempt >= self.total:
+            return False
+        if exception is not None:
+            return isinstance(exception, RETRYABLE_EXCEPTIONS)
+        return status_code in self.status_codes
+
+    def backoff(self, attempt, retry_after=None):
+        delay = min(self.max_backoff, self.backoff_factor * 2 ** attempt)
+        if self.jitter:
+            delay = random.uniform(0, delay)
+        return max(delay, retry_after or 0)
+
+    def sleep(self, attempt, retry_after=None):
+        delay = self.backoff(attempt, retry_after)
+        time.sleep(delay)
+        return delay
@@ -0,0 +1,201 @@
+import itertools
+import json
+import sqlite3
+
+from .api import _build_search_tags
+from .models import (
+    And, Or, Tag, Author, Filter, FilterParser, CreatedAtFilter,
+    to_result_type)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS hits (
+    object_id INTEGER PRIMARY KEY,
+    created_at_i INTEGER NOT NULL,
+    author TEXT,
+    points INTEGER,
+    num_comments INTEGER,
+    story_id INTEGER,
+    parent_id INTEGER,
+    title TEXT,
+    url TEXT,
+    story_text TEXT,
+    comment_text TEXT,
+    doc TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS hit_tags (
+    tag TEXT NOT NULL,
+    object_id INTEGER NOT NULL,
+    PRIMARY KEY (tag, object_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS hits_created_at_i ON hits (created_at_i);
+CREATE INDEX IF NOT EXISTS hits_author ON hits (author, created_at_i);
+CREATE INDEX IF NOT EXISTS hits_story_id ON hits (story_id, created_at_i);
+CREATE INDEX IF NOT EXISTS hits_points ON hits (points);
+CREATE INDEX IF NOT EXISTS hits_num_comments ON hits (num_comments);
+CREATE INDEX IF NOT EXISTS hit_tags_object_id ON hit_tags (object_id);
+"""
+
+HIT_COLUMNS = (
+    'created_at_i', 'author', 'points', 'num_comments', 'story_id',
+    'parent_id', 'title', 'url', 'story_text', 'comment_text')
+
+TEXT_COLUMNS = ('title', 'url', 'story_text', 'comment_text')
+
+
+def _in_sql(column, values):
+    if len(values) == 1:
+        return '{} = ?'.format(column), values
+    return '{} IN ({})'.format(column, ', '.join('?' * len(values))), values
+
+
+def _tags_in_sql(tags):
+    condition, params = _in_sql('tag', tags)
+    return ('object_id IN (SELECT object_id FROM hit_tags WHERE {})'.format(
+        condition), params)
+
+
+def _join_sql(operator, parts):
+    if len(parts) == 1:
+        return parts[0]
+    params = []
+    for _, part_params in parts:
+        params.extend(part_params)
+    return '({})'.format(' {} '.format(operator).join(
+        condition for condition, _ in parts)), params
+
+
+def tags_to_sql(tags):
+    """Translate a tag expression into a SQL condition and its params.
+
+    Chains of the same operator are flattened, and the tags of an OR are
+    matched with `IN` lists: watchlists of thousands of authors make a flat
+    condition, not one nesting level per tag.
+    """
+    if isinstance(tags, And):
+        return _join_sql('AND', [
+            tags_to_sql(operand) for operand in tags.operands()])
+    if isinstance(tags, Or):
+        authors, others, parts = {}, {}, []
+        for operand in tags.operands():
+            if isinstance(operand, Author):
+                authors[operand.value] = None
+            elif isinstance(operand, Tag):
+                others[str(operand)] = None
+            else:
+                parts.append(tags_to_sql(operand))
+        if others:
+            parts.insert(0, _tags_in_sql(list(others)))
+        if authors:
+            parts.insert(0, _in_sql('author', list(authors)))
+        return _join_sql('OR', parts)
+    if isinstance(tags, Author):
+        return 'author = ?', [tags.value]
+    if isinstance(tags, Tag):
+        return _tags_in_sql([str(tags)])
+    raise TypeError("Can't translate {!r} to SQL".format(tags))
+
+
+def filter_to_sql(filter):
+    if not isinstance(filter, Filter):
+        raise TypeError("Can't translate {!r} to SQL".format(filter))
+    column = getattr(filter, 'FIELD_NAME', filter.FILTER_PREFIX)
+    value = filter.get_value()
+    if isinstance(filter, CreatedAtFilter):
+        value = int(value)
+    return '{} {} ?'.format(column, filter.operator.operator), [value]
+
+
+def query_to_sql(q=None, tags=None, parser=None):
+    conditions, params = [], []
+    if q:
+        # Rough approximation of Algolia's full text search: every word has
+        # to be somewhere in the title, url or text.
+        for word in q.split():
+            conditions.append('({})'.format(' OR '.join(
+                '{} LIKE ?'.format(column) for column in TEXT_COLUMNS)))
+            params.extend(['%{}%'.format(word)] * len(TEXT_COLUMNS))
+    if tags:
+        condition, tag_params = tags_to_sql(tags)
+        conditions.append(condition)
+        params.extend(tag_params)
+    for filter in (parser._filters if parser else []):
+        condition, filter_params = filter_to_sql(filter)
+        conditions.append(condition)
+        params.extend(filter_params)
+    return ' AND '.join(conditions) or '1', params
+
+
+class Store:
+    """Local SQLite mirror of search hits.
+
+    `query` accepts the same arguments as `search_by_date` and answers them
+    with indexed SQL, newest hits first.
+    """
+
+    def __init__(self, path):
+        self.path = str(path)
+        self._conn = sqlite3.connect(self.path)
+        self._conn.executescript(SCHEMA)
+
+    def close(self):
+        self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def load(self, hits, batch_size=10000):
+        """Insert or update `hits`, returns how many were loaded."""
+        hits = iter(hits)
+        loaded = 0
+        while True:
+            batch = list(itertools.islice(hits, batch_size))
+            if not batch:
+                return loaded
+            with self._conn:
+                self._load_batch(batch)
+            loaded += len(batch)
+
+    def _load_batch(self, hits):
+        rows, tag_rows = [], []
+        for hit in hits:
+            object_id = int(hit['objectID'])
+            values = [hit.get(column) for column in HIT_COLUMNS]
+            rows.append([object_id] + values + [json.dumps(hit)])
+            tag_rows.extend((tag, object_id) for tag in hit.get('_tags', ()))
+        self._conn.executemany(
+            'DELETE FROM hit_tags WHERE object_id = ?',
+            [(row[0],) for row in rows])
+        insert = 'INSERT OR REPLACE INTO hits (object_id, {}, doc) VALUES ({})'
+        self._conn.executemany(insert.format(
+            ', '.join(HIT_COLUMNS), ', '.join('?' * len(rows[0]))), rows)
+        self._conn.executemany(
+            'INSERT OR IGNORE INTO hit_tags (tag, object_id) VALUES (?, ?)',
+            tag_rows)
+
+    def _where(self, q=None, author=None, story_id=None, stories=None,
+               comments=None, show_hn=None, ask_hn=None, front_page=None,
+               polls=None, pollopt=None, tags=None, **filters):
+        tags = _build_search_tags(
+            author=author, story_id=story_id, stories=stories,
+            comments=comments, show_hn=show_hn, ask_hn=ask_hn,
+            front_page=front_page, polls=polls, pollopt=pollopt, tags=tags)
+        parser = FilterParser.parse(**filters) if filters else None
+        return query_to_sql(q, tags, parser)
+
+    def query(self, *args, result_type=dict, limit=None, **kwargs):
+        where, params = self._where(*args, **kwargs)
+        sql = 'SELECT doc FROM hits WHERE {} ORDER BY created_at_i DESC'
+        sql = sql.format(where)
+        if limit is not None:
+            sql += ' LIMIT {:d}'.format(limit)
+        for doc, in self._conn.execute(sql, params):
+            yield to_result_type(json.loads(doc), result_type)
+
+    def count(self, *args, **kwargs):
+        where, params = self._where(*args, **kwargs)
+        return self._conn.execute(
+            'SELECT COUNT(*) FROM hits WHERE {}'.format(where),
+            params).fetchone()[0]
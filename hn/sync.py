@@ -0,0 +1,80 @@
+import json
+import os
+import time
+
+from .api import _build_search_params, _created_at_range, get_default_client
+from .models import FilterParser
+from .pagination import SearchResults
+from .utils import atomic_write_json
+
+
+def query_key(params):
+    return json.dumps(
+        {key: value for key, value in params.items() if key != 'hitsPerPage'},
+        sort_keys=True)
+
+
+class SyncState:
+    """High-water marks of synced queries, stored in a JSON file.
+
+    For each query it keeps the newest `created_at_i` seen and when it was
+    synced.
+    """
+
+    def __init__(self, path):
+        self.path = str(path)
+        self._marks = {}
+        if os.path.exists(self.path):
+            with open(self.path) as fp:
+                self._marks = json.load(fp)
+
+    def get(self, key):
+        return self._marks.get(key)
+
+    def set(self, key, created_at_i):
+        self._marks[key] = {
+            'created_at_i': created_at_i,
+            'synced_at': int(time.time()),
+        }
+
+    def save(self):
+        atomic_write_json(self.path, self._marks)
+
+
+def sync(state, q=None, author=None, story_id=None, stories=None,
+         comments=None, show_hn=None, ask_hn=None, front_page=None,
+         polls=None, pollopt=None, tags=None, hits_per_page=1000,
+         overlap=3600, client=None, **filters):
+    """Yield the hits created since the last sync of the same query.
+
+    Hits from the last `overlap` seconds before the high-water mark are
+    fetched again, to pick up late indexed items and fresh `points` and
+    `num_comments`. The state is saved once all hits have been consumed.
+    """
+    client = client or get_default_client()
+    params, parser = _build_search_params(
+        q=q, author=author, story_id=story_id, stories=stories,
+        comments=comments, show_hn=show_hn, ask_hn=ask_hn,
+        front_page=front_page, polls=polls, pollopt=pollopt, tags=tags,
+        hits_per_page=hits_per_page, **filters)
+    key = query_key(params)
+
+    mark = state.get(key)
+    since = mark['created_at_i'] - overlap if mark is not None else None
+    if since is not None and since > _created_at_range(parser)[0]:
+        if parser:
+            parser = parser.replace(created_at__gte=since)
+        else:
+            parser = FilterParser.parse(created_at__gte=since)
+        params['numericFilters'] = str(parser)
+
+    newest = None
+    for hit in SearchResults(client, params, parser):
+        if newest is None or hit['created_at_i'] > newest:
+            newest = hit['created_at_i']
+        yield hit
+
+    if newest is not None and (
+            mark is None or newest >= mark['created_at_i']):
+        state.set(key, newest)
+        state.save()
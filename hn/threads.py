@@ -0,0 +1,180 @@
+from array import array
+from collections import namedtuple
+
+from .api import get_default_client
+from .columnar import Dictionary
+
+# Threads with up to this many comments are fetched in a single nested
+# `items/<id>` response, bigger ones are swept with searches.
+MAX_NESTED_COMMENTS = 1000
+
+Node = namedtuple(
+    'Node', ['id', 'parent_id', 'created_at_i', 'author', 'text'])
+
+
+def _hit_node(hit):
+    return Node(
+        int(hit['objectID']), hit.get('parent_id'), hit['created_at_i'],
+        hit.get('author'), hit.get('comment_text') or hit.get('story_text'))
+
+
+def _item_nodes(item):
+    """Yield a `Node` for `item` and every item nested in its children."""
+    stack = [item]
+    while stack:
+        item = stack.pop()
+        yield Node(
+            item['id'], item.get('parent_id'), item['created_at_i'],
+            item.get('author'), item.get('text'))
+        stack.extend(item.get('children') or ())
+
+
+class Thread:
+    """A story and its comments, in flat arrays.
+
+    Items are addressed by position, the story being 0. `parents` holds the
+    position of each item's parent (-1 for the story, and for comments
+    whose parent couldn't be found). Children are stored in CSR form: the
+    children of position `i` are `children[child_offsets[i]:
+    child_offsets[i + 1]]`, oldest first. Authors are dictionary encoded.
+    """
+
+    def __init__(self, story, comments):
+        nodes = [story] + sorted(
+            (node for node in comments if node.id != story.id),
+            key=lambda node: (node.created_at_i, node.id))
+        size = len(nodes)
+        self.authors = Dictionary()
+        self.ids = array('q', (node.id for node in nodes))
+        self.created_at_i = array('q', (node.created_at_i for node in nodes))
+        self.author_codes = array('i', (
+            -1 if node.author is None else self.authors.encode(node.author)
+            for node in nodes))
+        self.texts = [node.text for node in nodes]
+        self._positions = {node.id: i for i, node in enumerate(nodes)}
+
+        self.parents = array('q', [-1]) * size
+        counts = array('q', [0]) * (size + 1)
+        for i in range(1, size):
+            parent = self._positions.get(nodes[i].parent_id, -1)
+            self.parents[i] = parent
+            if parent >= 0:
+                counts[parent + 1] += 1
+        for i in range(size):
+            counts[i + 1] += counts[i]
+        self.child_offsets = counts
+        self.children = array('q', [0]) * counts[size]
+        filled = array('q', counts[:size])
+        for i in range(1, size):
+            parent = self.parents[i]
+            if parent >= 0:
+                self.children[filled[parent]] = i
+                filled[parent] += 1
+
+    @classmethod
+    def from_item(cls, item):
+        nodes = _item_nodes(item)
+        return cls(next(nodes), nodes)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __contains__(self, item_id):
+        return item_id in self._positions
+
+    @property
+    def story_id(self):
+        return self.ids[0]
+
+    def position(self, item_id):
+        return self._positions[item_id]
+
+    def item(self, item_id):
+        i = self._positions[item_id]
+        code = self.author_codes[i]
+        parent = self.parents[i]
+        return {
+            'id': item_id,
+            'parent_id': self.ids[parent] if parent >= 0 else None,
+            'created_at_i': self.created_at_i[i],
+            'author': self.authors.values[code] if code >= 0 else None,
+            'text': self.texts[i],
+        }
+
+    def _children(self, i):
+        return self.children[self.child_offsets[i]:self.child_offsets[i + 1]]
+
+    def children_of(self, item_id):
+        return [self.ids[i] for i in self._children(self._positions[item_id])]
+
+    def parent_of(self, item_id):
+        parent = self.parents[self._positions[item_id]]
+        return self.ids[parent] if parent >= 0 else None
+
+    def orphans(self):
+        """Ids of the comments whose parent couldn't be fetched."""
+        return [
+            self.ids[i] for i in range(1, len(self)) if self.parents[i] < 0]
+
+    def walk(self, item_id=None):
+        """Yield `(depth, id)` depth first, from the story or `item_id`."""
+        start = 0 if item_id is None else self._positions[item_id]
+        stack = [(0, start)]
+        while stack:
+            depth, i = stack.pop()
+            yield depth, self.ids[i]
+            stack.extend(
+                (depth + 1, child) for child in reversed(self._children(i)))
+
+
+def _newest_hit(client, **params):
+    return next(iter(client.search_by_date(hits_per_page=1, **params)), None)
+
+
+def _fetch_missing(client, story_id, nodes, max_workers):
+    """Fetch the subtrees of parents missing from `nodes`, in parallel."""
+    tried = {story_id}
+    while True:
+        missing = {
+            node.parent_id for node in nodes.values()
+            if node.parent_id is not None and node.parent_id not in nodes
+        } - tried
+        if not missing:
+            return
+        tried.update(missing)
+        for result in client.get_items(
+                sorted(missing), max_workers=max_workers, ordered=False):
+            if result.value is None:
+                continue
+            for node in _item_nodes(result.value):
+                nodes.setdefault(node.id, node)
+
+
+def get_thread(story_id, client=None, max_nested=MAX_NESTED_COMMENTS,
+               max_workers=8, max_window_hits=1000):
+    """Fetch a whole discussion as a `Thread`, None if it doesn't exist.
+
+    Threads of up to `max_nested` comments come in one `items/<id>` request.
+    Bigger ones are crawled with parallel searches of the story's comments,
+    between the story and its newest comment, in windows split down to
+    `max_window_hits` comments. Subtrees they miss (like comments not
+    indexed by the search) are fetched as items.
+    """
+    client = client or get_default_client()
+    story = _newest_hit(client, stories=True, story_id=story_id)
+    if story is None or (story.get('num_comments') or 0) <= max_nested:
+        item = client.get_item(story_id)
+        return Thread.from_item(item) if item is not None else None
+
+    nodes = {}
+    newest = _newest_hit(client, comments=True, story_id=story_id)
+    if newest is not None:
+        for hit in client.parallel_search_by_date(
+                comments=True, story_id=story_id, windows=max_workers,
+                max_window_hits=max_window_hits,
+                created_at__gte=story['created_at_i'],
+                created_at__lte=newest['created_at_i']):
+            node = _hit_node(hit)
+            nodes[node.id] = node
+    _fetch_missing(client, int(story_id), nodes, max_workers)
+    return Thread(_hit_node(story), nodes.values())
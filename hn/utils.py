@@ -1,4 +1,14 @@
-from datetime import datetime
+import functools
+import itertools
+import json
+import os
+import queue
+import re
+import tempfile
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
 
 AVAILABLE_DATE_FORMATS = [
     '%Y',
@@ -12,7 +22,33 @@ AVAILABLE_DATE_FORMATS = [
 def parse_date(dt):
     if isinstance(dt, datetime):
         return dt
+    if isinstance(dt, (int, float)):
+        return datetime.fromtimestamp(dt, timezone.utc).replace(tzinfo=None)
+    return _parse_date_string(dt)
 
+
+@functools.lru_cache(maxsize=4096)
+def _parse_date_string(dt):
+    # Dispatch on the shape of the string instead of trying every format;
+    # anything unusual falls back to `strptime`.
+    try:
+        size = len(dt)
+        if size == 4 and dt.isdigit():
+            return datetime(int(dt), 1, 1)
+        if size == 7 and dt[4] == '-' and dt[:4].isdigit() and (
+                dt[5:].isdigit()):
+            return datetime(int(dt[:4]), int(dt[5:]), 1)
+        if size >= 10 and dt[4] == '-' and dt[7] == '-':
+            if size == 10 or (size == 19 and dt[10] == ' '):
+                return datetime.fromisoformat(dt)
+            if size in (20, 24) and dt[10] == 'T' and dt[-1] == 'Z':
+                return datetime.fromisoformat(dt[:-1])
+    except ValueError:
+        pass
+    return _strptime(dt)
+
+
+def _strptime(dt):
     for format in AVAILABLE_DATE_FORMATS:
         try:
             return datetime.strptime(dt, format)
@@ -20,3 +56,137 @@ def parse_date(dt):
             pass
 
     raise ValueError("Invalid date format, see AVAILABLE_DATE_FORMATS")
+
+
+def put_until_stopped(items, item, stop, timeout=0.1):
+    """Put `item` in the bounded queue `items`, unless `stop` gets set
+    while waiting for room. Returns whether it was put."""
+    while not stop.is_set():
+        try:
+            items.put(item, timeout=timeout)
+            return True
+        except queue.Full:
+            pass
+    return False
+
+
+def put_pages(items, size, put):
+    """Put `items` in lists of `size` with `put`, until it returns False.
+    Returns whether every item was put."""
+    items = iter(items)
+    while True:
+        page = list(itertools.islice(items, size))
+        if not page:
+            return True
+        if not put(page):
+            return False
+
+
+_Submitted = namedtuple('_Submitted', ['task'])
+_Failed = namedtuple('_Failed', ['exception'])
+
+
+def fan_in(tasks, max_workers, maxsize=None):
+    """Run `tasks` on `max_workers` threads, yielding what they put as it
+    arrives.
+
+    Tasks are called as `task(put, submit)`. `put(item)` waits for room in
+    a queue of `maxsize` items (twice `max_workers` by default) and returns
+    False once the consumer is gone, the task should then return.
+    `submit(task)` schedules one more task. Exceptions raised by tasks are
+    raised to the consumer, and closing the generator stops the tasks.
+    """
+    items = queue.Queue(maxsize=maxsize or max_workers * 2)
+    stop = threading.Event()
+    put = functools.partial(put_until_stopped, items, stop=stop)
+    done = object()
+
+    def submit(task):
+        return put(_Submitted(task))
+
+    def run(task):
+        try:
+            task(put, submit)
+        except BaseException as exc:
+            put(_Failed(exc))
+        else:
+            put(done)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(run, task) for task in tasks]
+        try:
+            remaining = len(futures)
+            while remaining:
+                item = items.get()
+                if item is done:
+                    remaining -= 1
+                elif isinstance(item, _Failed):
+                    raise item.exception
+                elif isinstance(item, _Submitted):
+                    futures.append(executor.submit(run, item.task))
+                    remaining += 1
+                else:
+                    yield item
+        finally:
+            stop.set()
+            for future in futures:
+                future.cancel()
+
+
+def atomic_write_json(path, doc):
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w') as fp:
+            json.dump(doc, fp, indent=2, sort_keys=True)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+_json_decoder = json.JSONDecoder()
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+_HITS_START = re.compile(r'[ \t\n\r]*\{[ \t\n\r]*"hits"[ \t\n\r]*:[ \t\n\r]*\[')
+
+
+def iter_json_hits(chunks):
+    """Yield the hits of a search response as its body chunks are read.
+
+    `chunks` is an iterable of `str`. Only one hit is decoded at a time; if the
+    body doesn't start with the `hits` array, it's decoded in full instead.
+    """
+    chunks = iter(chunks)
+    buffer = ''
+    match = None
+    for chunk in chunks:
+        buffer += chunk
+        match = _HITS_START.match(buffer)
+        if match or len(buffer) > 64:
+            break
+    if not match:
+        yield from json.loads(buffer + ''.join(chunks))['hits']
+        return
+
+    position = match.end()
+    while True:
+        position = _WHITESPACE.match(buffer, position).end()
+        if position < len(buffer):
+            if buffer[position] == ']':
+                return
+            if buffer[position] == ',':
+                position += 1
+                continue
+            try:
+                hit, position = _json_decoder.raw_decode(buffer, position)
+            except ValueError:
+                pass
+            else:
+                yield hit
+                continue
+
+        chunk = next(chunks, None)
+        if chunk is None:
+            raise ValueError('Incomplete search response')
+        buffer = buffer[position:] + chunk
+        position = 0
@@ -0,0 +1,92 @@
+import json
+import re
+from datetime import datetime, timezone
+from urllib.parse import urlparse, parse_qs
+
+import pytest
+import responses
+
+NUMERIC_FILTER_RE = re.compile(r'^(\w+)(<=|>=|<|>|=)(-?\d+)$')
+OPERATORS = {
+    '<': lambda a, b: a < b,
+    '<=': lambda a, b: a <= b,
+    '>': lambda a, b: a > b,
+    '>=': lambda a, b: a >= b,
+    '=': lambda a, b: a == b,
+}
+
+
+class FakeSearchByDate:
+    """Serves `search_by_date` pages out of an in-memory list of hits."""
+
+    def __init__(self, hits, filter_tags=False):
+        self.hits = sorted(
+            hits, key=lambda hit: hit['created_at_i'], reverse=True)
+        self.filter_tags = filter_tags
+        self.requests = []
+
+    def _matches_tags(self, hit, tags):
+        # Only one level of ORs: `a,(b,c)` means a AND (b OR c).
+        for term in re.findall(r'\([^)]*\)|[^,()]+', tags):
+            if not set(term.strip('()').split(',')) & set(hit['_tags']):
+                return False
+        return True
+
+    def _matches(self, hit, numeric_filters):
+        for numeric_filter in numeric_filters:
+            field, operator, value = NUMERIC_FILTER_RE.match(
+                numeric_filter).groups()
+            if not OPERATORS[operator](hit[field], int(value)):
+                return False
+        return True
+
+    def __call__(self, request):
+        query = parse_qs(urlparse(request.url).query)
+        self.requests.append(query)
+        numeric_filters = []
+        if 'numericFilters' in query:
+            numeric_filters = query['numericFilters'][0].split(',')
+        hits_per_page = int(query['hitsPerPage'][0])
+        page = int(query.get('page', ['0'])[0])
+
+        matching = [
+            hit for hit in self.hits if self._matches(hit, numeric_filters)]
+        if self.filter_tags and 'tags' in query:
+            matching = [
+                hit for hit in matching
+                if self._matches_tags(hit, query['tags'][0])]
+        start = page * hits_per_page
+        doc = {
+            'hits': matching[start:start + hits_per_page],
+            'nbHits': len(matching),
+            'page': page,
+            'hitsPerPage': hits_per_page,
+        }
+        return (200, {}, json.dumps(doc))
+
+
+def make_hit(object_id, created_at_i, **extra):
+    hit = {
+        'objectID': str(object_id),
+        'created_at_i': created_at_i,
+        'created_at': datetime.fromtimestamp(
+            created_at_i, timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.000Z'),
+        'author': 'pg',
+        'points': 1,
+        'num_comments': 0,
+        '_tags': ['comment', 'author_pg', 'story_1'],
+    }
+    hit.update(extra)
+    return hit
+
+
+@pytest.fixture
+def fake_search():
+    with responses.RequestsMock(assert_all_requests_are_fired=False) as rsps:
+        def register(hits, filter_tags=False):
+            fake = FakeSearchByDate(hits, filter_tags)
+            rsps.add_callback(
+                responses.GET, 'https://hn.algolia.com/api/v1/search_by_date',
+                callback=fake)
+            return fake
+        yield register
@@ -320,34 +320,34 @@ def test_parse_filters():
     filters = FilterParser.parse(
         created_at='2018', points='5', num_comments__gt='10')
 
-    assert filters._filters == [
+    assert filters._filters == (
         CreatedAtFilter(datetime(2018, 1, 1), models.EQUALS_OPERATOR),
         PointsFilter(5, models.EQUALS_OPERATOR),
         NumCommentsFilter(10, models.GREATER_OPERATOR)
-    ]
+    )
 
     filters = FilterParser.parse(
         created_at__lt='2017-09', points__gte='15', num_comments__lt='100')
 
-    assert filters._filters == [
+    assert filters._filters == (
         CreatedAtFilter(datetime(2017, 9, 1), models.LESS_OPERATOR),
         PointsFilter(15, models.GREATER_EQUALS_OPERATOR),
         NumCommentsFilter(100, models.LESS_OPERATOR)
-    ]
+    )
 
     filters = FilterParser.parse(
         created_at__lte='2018-09', created_at__gt='2017-09',
         points__gte='15', points__lt=100,
         num_comments__lt='100', num_comments__gte='35')
 
-    assert filters._filters == [
+    assert filters._filters == (
         CreatedAtFilter(datetime(2018, 9, 1), models.LESS_EQUALS_OPERATOR),
         CreatedAtFilter(datetime(2017, 9, 1), models.GREATER_OPERATOR),
         PointsFilter(15, models.GREATER_EQUALS_OPERATOR),
         PointsFilter(100, models.LESS_OPERATOR),
         NumCommentsFilter(100, models.LESS_OPERATOR),
         NumCommentsFilter(35, models.GREATER_EQUALS_OPERATOR),
-    ]
+    )
 
 
 def test_parse_filters_replace_with_replacement():
@@ -394,3 +394,47 @@ def test_parse_filter_string():
     filters = FilterParser.parse(
         created_at__lte='2018', points__lt='5', num_comments__gte='10')
     assert str(filters) == 'created_at_i<=1514764800,points<5,num_comments>=10'
+
+
+@pytest.mark.parametrize('filters', [
+    {},
+    {'points__gt': 10},
+    {'created_at__lt': '2018', 'points__gt': 10},
+    {'points__gt': 10, 'created_at__lte': '2018', 'num_comments': 5},
+    {'created_at__gt': '2017', 'created_at__lte': '2018'},
+])
+def test_replace_str_matches_replace(filters):
+    parser = FilterParser.parse(**filters) if filters else FilterParser([])
+    for created_at_i in (1542316220, 1542316219):
+        assert parser.replace_str(created_at__lte=created_at_i) == str(
+            parser.replace(created_at__lte=created_at_i))
+
+
+def test_replace_str_renders_other_filters_once():
+    parser = FilterParser.parse(created_at__gt='2017', points__gt=10)
+    parser.replace_str(created_at__lte=1542316220)
+
+    template = parser._templates[
+        (CreatedAtFilter, models.LESS_EQUALS_OPERATOR)]
+    assert template == ('created_at_i>1483228800,points>10,', '')
+
+
+def test_filters_are_immutable_and_hashable():
+    filter = PointsFilter(10, models.GREATER_OPERATOR)
+    with pytest.raises(AttributeError):
+        filter.value = 20
+    assert str(filter) is str(filter)
+
+    parser = FilterParser.parse(points__gt=10, created_at='2018')
+    assert parser == FilterParser.parse(points__gt=10, created_at='2018')
+    assert len({parser, FilterParser.parse(
+        points__gt=10, created_at='2018')}) == 1
+
+    rendered = str(parser)
+    with pytest.raises(AttributeError):
+        parser._filters = ()
+    with pytest.raises(AttributeError):
+        parser._filters.append(PointsFilter(5, models.LESS_OPERATOR))
+    assert str(parser) is rendered
+    assert hash(parser) == hash(
+        FilterParser.parse(points__gt=10, created_at='2018'))
@@ -0,0 +1,89 @@
+import functools
+
+import pytest
+
+from hn.columnar import HitBatch
+from hn.models import Author, FilterParser, Or, PostType, StoryID
+from hn.tags import Story, Comment, AskHN
+
+
+def _hits():
+    return [
+        {'objectID': '1', 'created_at_i': 1514764800, 'author': 'pg',
+         'points': 100, 'num_comments': 20, 'story_id': None,
+         '_tags': ['story', 'author_pg', 'story_1']},
+        {'objectID': '2', 'created_at_i': 1514764900, 'author': 'dang',
+         'points': None, 'num_comments': None, 'story_id': 1,
+         '_tags': ['comment', 'author_dang', 'story_1']},
+        {'objectID': '3', 'created_at_i': 1546300800, 'author': 'pg',
+         'points': 5, 'num_comments': 0, 'story_id': 3,
+         '_tags': ['story', 'author_pg', 'story_3', 'ask_hn']},
+    ]
+
+
+EXPRESSIONS = [
+    (Story, [True, False, True]),
+    (Author('pg'), [True, False, True]),
+    (Author('nobody'), [False, False, False]),
+    (StoryID(1), [True, True, False]),
+    (Comment & StoryID('1'), [False, True, False]),
+    (Author('dang') | AskHN, [False, True, True]),
+    (Story & (Author('dang') | PostType('ask_hn')), [False, False, True]),
+    (FilterParser.parse(points__gt=10), [True, False, False]),
+    (FilterParser.parse(points__lte=100, created_at__gte='2018-06'),
+     [False, False, True]),
+    (FilterParser.parse(num_comments=0), [False, False, True]),
+    (FilterParser.parse(created_at__lt='2018-01-01 00:01:00'),
+     [True, False, False]),
+    (FilterParser(()), [True, True, True]),
+]
+
+
+@pytest.mark.parametrize('expression, expected', EXPRESSIONS)
+def test_compiled_predicate_on_hits(expression, expected):
+    predicate = expression.compile()
+
+    assert [predicate(hit) for hit in _hits()] == expected
+    assert list(predicate.filter(_hits())) == [
+        hit for hit, matches in zip(_hits(), expected) if matches]
+
+
+@pytest.mark.parametrize('expression, expected', EXPRESSIONS)
+def test_compiled_predicate_on_columns(expression, expected):
+    pytest.importorskip('numpy')
+    batch = HitBatch()
+    batch.extend(_hits())
+
+    assert expression.compile().mask(batch).tolist() == expected
+
+
+def test_compiled_tag_needs_tags_column():
+    pytest.importorskip('numpy')
+    batch = HitBatch()
+    batch.extend(_hits())
+    columns = batch.to_numpy()
+    del columns['tags']
+
+    with pytest.raises(ValueError):
+        Story.compile().mask(columns)
+
+
+def test_compiled_deep_or_tree():
+    np = pytest.importorskip('numpy')
+    expression = functools.reduce(
+        Or, [Author('user{}'.format(i)) for i in range(3000)] +
+        [Author('dang'), StoryID(3)] +
+        [PostType('tag{}'.format(i)) for i in range(3000)]) & Story
+    predicate = expression.compile()
+    assert [predicate(hit) for hit in _hits()] == [False, False, True]
+
+    batch = HitBatch()
+    batch.extend(_hits())
+    assert predicate.mask(batch).tolist() == [False, False, True]
+    columns = batch.to_numpy()
+    del columns['author_dictionary'], columns['story_id']
+    assert np.array_equal(
+        (expression | Comment).compile().mask(columns), [False, True, True])
+
+    assert repr(expression).endswith(
+        ', PostType(tag2999)), PostType(story))')
@@ -0,0 +1,61 @@
+import json
+from datetime import datetime
+from pathlib import Path
+
+from hn.models import Hit, Item, User, to_result_type
+
+REQUESTS_PATH = Path(__file__).parent.parent / 'requests'
+
+
+def _load(name):
+    with (REQUESTS_PATH / name).open() as fp:
+        return json.loads(fp.read())
+
+
+def test_hit_from_dict():
+    doc = _load('1.1.json')['hits'][0]
+    hit = Hit.from_dict(doc)
+
+    assert hit.object_id == '18463371'
+    assert hit.created_at_i == 1542316234
+    assert hit.created_at == datetime(2018, 11, 15, 21, 10, 34)
+    assert hit.author == 'komali2'
+    assert hit.story_id == 18445714
+    assert hit.tags == ('comment', 'author_komali2', 'story_18445714')
+    assert not hasattr(hit, '__dict__')
+
+
+def test_records_intern_repeated_strings():
+    doc = _load('1.1.json')['hits'][0]
+    first = Hit.from_dict(json.loads(json.dumps(doc)))
+    second = Hit.from_dict(json.loads(json.dumps(doc)))
+
+    assert first == second
+    assert first.author is second.author
+    assert first.tags[0] is second.tags[0]
+
+
+def test_item_from_dict():
+    item = Item.from_dict(_load('item.json'))
+
+    assert item.id == 18562744
+    assert item.type == 'story'
+    assert len(item.children) == 4
+    assert isinstance(item.children[0], Item)
+    assert item.children[0].parent_id == 18562744
+    assert Item.from_dict(item.to_dict()) == item
+
+
+def test_user_from_dict():
+    user = User.from_dict(_load('pg.json'))
+
+    assert user.username == 'pg'
+    assert user.karma == 155173
+    assert user.created_at == datetime(2006, 10, 9, 18, 21, 32)
+
+
+def test_to_result_type():
+    doc = _load('pg.json')
+    assert to_result_type(doc) is doc
+    assert to_result_type(None, User) is None
+    assert to_result_type(doc, User) == User.from_dict(doc)
@@ -1,3 +1,4 @@
+import functools
 import pytest
 from calendar import timegm
 from datetime import datetime
@@ -104,3 +105,48 @@ def test_stingify_operated_tags():
 
     cond5 = Author('pg') & (PostType('story') | PostType('comment') | PostType('ask_hn'))
     assert str(cond5) == 'author_pg,(story,comment,ask_hn)'
+
+
+def test_tags_are_immutable_and_hashable():
+    author = Author('pg')
+    with pytest.raises(AttributeError):
+        author.value = 'dang'
+
+    query = (PostType('story') | PostType('poll')) & Author('pg')
+    assert hash(query) == hash(
+        (PostType('story') | PostType('poll')) & Author('pg'))
+    assert len({query, (PostType('story') | PostType('poll')) & Author('pg'),
+                Author('pg')}) == 2
+
+
+def test_nested_or_groups():
+    assert str(Or(
+        Or(PostType('a'), Or(PostType('b'), PostType('c'))),
+        PostType('d'))) == '(a,(b,c),d)'
+
+    # Rendering a subtree first doesn't change how its parent renders it.
+    left = PostType('a') | PostType('b')
+    assert str(left) == '(a,b)'
+    assert str(left | PostType('c')) == '(a,b,c)'
+
+
+def test_deep_tag_trees():
+    authors = ['user{}'.format(i) for i in range(10000)]
+    query = functools.reduce(Or, map(Author, authors)) & PostType('comment')
+
+    expected = '({}),comment'.format(
+        ','.join('author_' + author for author in authors))
+    assert str(query) == expected
+    assert query == functools.reduce(
+        Or, map(Author, authors)) & PostType('comment')
+
+
+def test_operands_of_chains():
+    a, b, c, d = (PostType(value) for value in 'abcd')
+    assert Or(Or(a, b), c).operands() == [a, b, c]
+    assert Or(a, Or(b, c)).operands() == [a, b, c]
+    assert Or(a & b, c | d).operands() == [a & b, c, d]
+    assert (a & b & (c | d)).operands() == [a, b, c | d]
+
+    authors = [Author('user{}'.format(i)) for i in range(10000)]
+    assert functools.reduce(Or, authors).operands() == authors
@@ -0,0 +1,116 @@
+import asyncio
+import json
+from pathlib import Path
+
+import pytest
+
+aiohttp = pytest.importorskip('aiohttp')
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from hn import aio
+from hn import tags
+
+BASE_PATH = Path(__file__).parent
+REQUESTS_PATH = BASE_PATH / 'requests'
+
+
+def _load(name):
+    with (REQUESTS_PATH / name).open() as fp:
+        return json.loads(fp.read())
+
+
+def _run_with_server(coro_factory, client=None):
+    requests_seen = []
+
+    async def search_by_date(request):
+        requests_seen.append(dict(request.query))
+        if 'numericFilters' not in request.query:
+            return web.json_response(_load('1.1.json'))
+        if request.query['numericFilters'].endswith('created_at_i<=1542316220'):
+            return web.json_response(_load('1.2.json'))
+        return web.json_response({'hits': []})
+
+    async def items(request):
+        if request.match_info['id'] == '18562744':
+            return web.json_response(_load('item.json'))
+        return web.json_response({}, status=404)
+
+    async def main():
+        app = web.Application()
+        app.router.add_get('/api/v1/search_by_date', search_by_date)
+        app.router.add_get('/api/v1/items/{id}', items)
+        async with TestServer(app) as server:
+            base_url = str(server.make_url('/api/v1/'))
+            if client is None:
+                used = aio.Client(base_url=base_url, concurrency=4)
+            else:
+                used = client
+                used.base_url = base_url
+            async with used:
+                return await coro_factory(used)
+
+    return asyncio.run(main()), requests_seen
+
+
+def test_aio_search_by_date_pages_like_sync_client():
+    async def collect(client):
+        return [hit async for hit in client.search_by_date(
+            author='pg', tags=tags.Story | tags.Comment, hits_per_page=2)]
+
+    hits, requests_seen = _run_with_server(collect)
+
+    assert [hit['story_id'] for hit in hits] == [
+        18445714, 18462671, 18460087, 18457200]
+    assert requests_seen[0] == {
+        'hitsPerPage': '2', 'tags': '(story,comment),author_pg'}
+
+
+def test_aio_get_items_keeps_order_and_maps_404_to_none():
+    async def fetch(client):
+        return await client.get_items([18562744, 0, 18562744])
+
+    items, _ = _run_with_server(fetch)
+
+    assert items[0]['id'] == 18562744
+    assert items[1] is None
+    assert items[2]['id'] == 18562744
+
+
+def test_aio_client_created_outside_the_loop():
+    # The semaphore has to bind to the loop running the requests, not to the
+    # one current when the client was built.
+    client = aio.Client(concurrency=1)
+
+    async def fetch(client):
+        return await client.get_items([18562744] * 5)
+
+    items, _ = _run_with_server(fetch, client=client)
+
+    assert [item['id'] for item in items] == [18562744] * 5
+
+
+def test_aio_search_by_date_raises_on_missing_endpoint():
+    async def search(client):
+        client.base_url = client.base_url.replace('/v1/', '/v2/')
+        return [hit async for hit in client.search_by_date(author='pg')]
+
+    with pytest.raises(aiohttp.ClientResponseError) as excinfo:
+        _run_with_server(search)
+    assert excinfo.value.status == 404
+
+
+def test_aio_client_keeps_the_session_it_was_given():
+    async def fetch(client):
+        async with aiohttp.ClientSession() as session:
+            given = aio.Client(base_url=client.base_url, session=session)
+            await given.close()
+            item = await given.get_item(18562744)
+            await given.close()
+            assert given._session is session
+            assert not session.closed
+            return item
+
+    item, _ = _run_with_server(fetch)
+
+    assert item['id'] == 18562744
@@ -2,13 +2,16 @@ import json
 import pytest
 from pathlib import Path
 
+import requests
 import responses
 
 from hn import search_by_date
 from hn import api
-from hn.models import PostType, StoryID
+from hn.models import Author, PostType, StoryID
 from hn import tags
 
+from conftest import make_hit
+
 BASE_PATH = Path(__file__).parent
 REQUESTS_PATH = BASE_PATH / 'requests'
 
@@ -52,7 +55,7 @@ def test_search_by_date_with_query_default_params():
             json=json.loads(fp.read()), status=200)
     with (REQUESTS_PATH / '1.2.json').open() as fp:
         responses.add(
-            responses.GET, 'https://hn.algolia.com/api/v1/search_by_date?query=rmotr&hitsPerPage=2&numericFilters=created_at_i<1542316220',
+            responses.GET, 'https://hn.algolia.com/api/v1/search_by_date?query=rmotr&hitsPerPage=2&numericFilters=created_at_i<=1542316220',
             json=json.loads(fp.read()), status=200)
 
     res = search_by_date('rmotr', hits_per_page=2)
@@ -77,7 +80,7 @@ def test_search_by_date_with_query_and_author_post_types_params():
             json=json.loads(fp.read()), status=200)
     with (REQUESTS_PATH / '1.2.json').open() as fp:
         responses.add(
-            responses.GET, 'https://hn.algolia.com/api/v1/search_by_date?query=rmotr&hitsPerPage=2&tags=(story,comment),author_pg&numericFilters=created_at_i<1542316220',
+            responses.GET, 'https://hn.algolia.com/api/v1/search_by_date?query=rmotr&hitsPerPage=2&tags=(story,comment),author_pg&numericFilters=created_at_i<=1542316220',
             json=json.loads(fp.read()), status=200)
 
     res = search_by_date(
@@ -104,7 +107,7 @@ def test_search_by_date_with_query_and_author_multiple_post_types_params():
             json=json.loads(fp.read()), status=200)
     with (REQUESTS_PATH / '1.2.json').open() as fp:
         responses.add(
-            responses.GET, 'https://hn.algolia.com/api/v1/search_by_date?query=rmotr&hitsPerPage=2&tags=(story,comment,show_hn,ask_hn,poll),author_pg&numericFilters=created_at_i<1542316220',
+            responses.GET, 'https://hn.algolia.com/api/v1/search_by_date?query=rmotr&hitsPerPage=2&tags=(story,comment,show_hn,ask_hn,poll),author_pg&numericFilters=created_at_i<=1542316220',
             json=json.loads(fp.read()), status=200)
 
     res = search_by_date(
@@ -131,7 +134,7 @@ def test_search_by_date_with_query_and_author_post_types():
             json=json.loads(fp.read()), status=200)
     with (REQUESTS_PATH / '1.2.json').open() as fp:
         responses.add(
-            responses.GET, 'https://hn.algolia.com/api/v1/search_by_date?query=rmotr&hitsPerPage=2&tags=(story,comment),author_pg&numericFilters=created_at_i<1542316220',
+            responses.GET, 'https://hn.algolia.com/api/v1/search_by_date?query=rmotr&hitsPerPage=2&tags=(story,comment),author_pg&numericFilters=created_at_i<=1542316220',
             json=json.loads(fp.read()), status=200)
 
     res = search_by_date(
@@ -158,7 +161,7 @@ def test_search_by_date_with_query_and_author_post_types_aliases():
             json=json.loads(fp.read()), status=200)
     with (REQUESTS_PATH / '1.2.json').open() as fp:
         responses.add(
-            responses.GET, 'https://hn.algolia.com/api/v1/search_by_date?query=rmotr&hitsPerPage=2&tags=(story,comment),author_pg&numericFilters=created_at_i<1542316220',
+            responses.GET, 'https://hn.algolia.com/api/v1/search_by_date?query=rmotr&hitsPerPage=2&tags=(story,comment),author_pg&numericFilters=created_at_i<=1542316220',
             json=json.loads(fp.read()), status=200)
 
     res = search_by_date(
@@ -185,7 +188,7 @@ def test_search_by_date_without_query_default_params():
             json=json.loads(fp.read()), status=200)
     with (REQUESTS_PATH / '1.2.json').open() as fp:
         responses.add(
-            responses.GET, 'https://hn.algolia.com/api/v1/search_by_date?hitsPerPage=2&numericFilters=created_at_i<1542316220',
+            responses.GET, 'https://hn.algolia.com/api/v1/search_by_date?hitsPerPage=2&numericFilters=created_at_i<=1542316220',
             json=json.loads(fp.read()), status=200)
 
     res = search_by_date(hits_per_page=2)
@@ -210,7 +213,7 @@ def test_search_by_date_without_query_default_params():
             json=json.loads(fp.read()), status=200)
     with (REQUESTS_PATH / '1.2.json').open() as fp:
         responses.add(
-            responses.GET, 'https://hn.algolia.com/api/v1/search_by_date?hitsPerPage=2&numericFilters=created_at_i<1542316220',
+            responses.GET, 'https://hn.algolia.com/api/v1/search_by_date?hitsPerPage=2&numericFilters=created_at_i<=1542316220',
             json=json.loads(fp.read()), status=200)
 
     res = search_by_date(hits_per_page=2)
@@ -235,7 +238,7 @@ def test_search_by_date_without_query_created_parameter():
             json=json.loads(fp.read()), status=200)
     with (REQUESTS_PATH / '1.2.json').open() as fp:
         responses.add(
-            responses.GET, 'https://hn.algolia.com/api/v1/search_by_date?hitsPerPage=2&numericFilters=created_at_i>1514764800,created_at_i<1542316220',
+            responses.GET, 'https://hn.algolia.com/api/v1/search_by_date?hitsPerPage=2&numericFilters=created_at_i>1514764800,created_at_i<=1542316220',
             json=json.loads(fp.read()), status=200)
 
     res = search_by_date(hits_per_page=2, created_at__gt='2018')
@@ -259,7 +262,7 @@ def test_search_by_date_with_query_created_and_points():
             json=json.loads(fp.read()), status=200)
     with (REQUESTS_PATH / '1.2.json').open() as fp:
         responses.add(
-            responses.GET, 'https://hn.algolia.com/api/v1/search_by_date?hitsPerPage=2&numericFilters=created_at_i>1514764800,points=50,created_at_i<1542316220',
+            responses.GET, 'https://hn.algolia.com/api/v1/search_by_date?hitsPerPage=2&numericFilters=created_at_i>1514764800,points=50,created_at_i<=1542316220',
             json=json.loads(fp.read()), status=200)
 
     res = search_by_date(hits_per_page=2, created_at__gt='2018', points=50)
@@ -276,6 +279,20 @@ def test_search_by_date_with_query_created_and_points():
     assert post['story_id'] == 18457200
 
 
+def test_search_by_date_stops_at_short_page(fake_search):
+    fake = fake_search([make_hit(i, 1542316220 - i) for i in range(5)])
+    assert len(list(api.Client().search_by_date(author='pg'))) == 5
+    assert len(fake.requests) == 1
+
+
+def test_search_by_date_stops_at_short_cursor_page(fake_search):
+    fake = fake_search([make_hit(i, 1542316220 - i) for i in range(4)])
+    found = list(api.Client().search_by_date(hits_per_page=3))
+    assert [hit['objectID'] for hit in found] == ['0', '1', '2', '3']
+    # The second page starts again from the last hit seen, and is short.
+    assert len(fake.requests) == 2
+
+
 @responses.activate
 def test_items_endpoint_is_found():
     with (REQUESTS_PATH / 'item.json').open() as fp:
@@ -324,3 +341,231 @@ def test_users_endpoint_not_found():
 
     user = api.get_user('IdontExist')
     assert user is None
+
+
+def test_client_mounts_pooled_adapter():
+    client = api.Client(pool_size=32)
+    adapter = client.session.get_adapter('https://hn.algolia.com/api/v1/')
+    assert adapter._pool_connections == 32
+    assert adapter._pool_maxsize == 32
+
+
+@responses.activate
+def test_client_base_url():
+    responses.add(
+        responses.GET, 'http://localhost:8000/api/v1/items/1', json={'id': 1})
+    responses.add(
+        responses.GET, 'http://localhost:8000/api/v1/search_by_date',
+        json={'hits': [], 'nbHits': 0})
+    client = api.Client(base_url='http://localhost:8000/api/v1/')
+
+    assert client.get_item(1) == {'id': 1}
+    assert list(client.search_by_date(stories=True)) == []
+
+
+@responses.activate
+def test_module_functions_use_default_client():
+    with (REQUESTS_PATH / 'pg.json').open() as fp:
+        responses.add(
+            responses.GET, 'https://hn.algolia.com/api/v1/users/pg',
+            json=json.loads(fp.read()), status=200)
+
+    client = api.Client()
+    api.set_default_client(client)
+    try:
+        assert api.get_default_client() is client
+        assert api.get_user('pg')['username'] == 'pg'
+    finally:
+        api.set_default_client(None)
+    assert api.get_default_client() is not client
+
+
+def test_split_window():
+    assert api._split_window(0, 10, 2) == [(0, 5), (5, 10)]
+    assert api._split_window(0, 10, 3) == [(0, 3), (3, 6), (6, 10)]
+    assert api._split_window(0, 2, 5) == [(0, 1), (1, 2)]
+
+
+def test_parallel_search_by_date_covers_range_without_duplicates(fake_search):
+    hits = [make_hit(i, 1514764800 + i * 10) for i in range(100)]
+    fake_search(hits)
+
+    found = list(api.Client().parallel_search_by_date(
+        hits_per_page=7, windows=4,
+        created_at__gte=1514764800, created_at__lt=1514764800 + 1000))
+
+    assert sorted(hit['objectID'] for hit in found) == sorted(
+        hit['objectID'] for hit in hits)
+
+
+def test_parallel_search_by_date_splits_dense_windows(fake_search):
+    sparse = [make_hit(i, 1514764800 + i * 100) for i in range(10)]
+    dense = [make_hit(100 + i, 1514765800 + i) for i in range(50)]
+    fake = fake_search(sparse + dense)
+
+    found = list(api.Client().parallel_search_by_date(
+        hits_per_page=100, windows=2, max_window_hits=20,
+        created_at__gte=1514764800, created_at__lt=1514766800))
+
+    assert len(found) == 60
+    assert len({hit['objectID'] for hit in found}) == 60
+    # Both initial windows plus the pieces the dense one was split into.
+    assert len(fake.requests) > 2
+
+
+def test_parallel_search_by_date_streams_pages(fake_search):
+    hits = [make_hit(i, 1514764800 + i) for i in range(100)]
+    fake = fake_search(hits)
+
+    found = api.Client().parallel_search_by_date(
+        hits_per_page=5, windows=1,
+        created_at__gte=1514764800, created_at__lt=1514764900)
+    assert next(found)['objectID'] == '99'
+    found.close()
+
+    # Only a few pages were fetched ahead of the consumer, not all 20.
+    assert len(fake.requests) < 10
+
+
+@responses.activate
+def test_get_items_in_order_reporting_errors():
+    with (REQUESTS_PATH / 'item.json').open() as fp:
+        responses.add(
+            responses.GET, 'https://hn.algolia.com/api/v1/items/18562744',
+            json=json.loads(fp.read()), status=200)
+    responses.add(
+        responses.GET, 'https://hn.algolia.com/api/v1/items/0000', status=404)
+    responses.add(
+        responses.GET, 'https://hn.algolia.com/api/v1/items/1', status=500)
+
+    results = list(api.Client().get_items(
+        ['0000', 18562744, '1', 18562744], max_workers=2))
+
+    assert [result.key for result in results] == [
+        '0000', 18562744, '1', 18562744]
+    assert results[0] == api.BatchResult('0000', None, None)
+    assert results[1].value['id'] == 18562744
+    assert results[2].value is None
+    assert isinstance(results[2].error, requests.HTTPError)
+    assert results[3].value['id'] == 18562744
+
+
+@responses.activate
+def test_get_users_unordered():
+    with (REQUESTS_PATH / 'pg.json').open() as fp:
+        responses.add(
+            responses.GET, 'https://hn.algolia.com/api/v1/users/pg',
+            json=json.loads(fp.read()), status=200)
+    responses.add(
+        responses.GET, 'https://hn.algolia.com/api/v1/users/IdontExist',
+        status=404)
+
+    results = api.get_users(['pg', 'IdontExist'] * 10, ordered=False)
+
+    values = {
+        result.key: result.value for result in results if not result.error}
+    assert values['pg']['username'] == 'pg'
+    assert values['IdontExist'] is None
+
+
+def author_hit(object_id, created_at_i, author, post_type='comment'):
+    return make_hit(object_id, created_at_i, author=author, _tags=[
+        post_type, 'author_' + author, 'story_1'])
+
+
+def test_pack_tags():
+    authors = [Author('user{}'.format(i)) for i in range(10)]
+
+    chunks = list(api._pack_tags(authors, 40))
+
+    assert [str(chunk) for chunk in chunks] == [
+        '(author_user0,author_user1,author_user2)',
+        '(author_user3,author_user4,author_user5)',
+        '(author_user6,author_user7,author_user8)',
+        'author_user9',
+    ]
+    assert all(len(str(chunk)) <= 40 for chunk in chunks)
+
+
+def test_plan_searches_batches_authors():
+    jobs = api._plan_searches({
+        'pg': {'author': 'pg', 'comments': True},
+        'dang': {'author': 'dang', 'comments': True},
+        'also pg': {'author': 'pg', 'comments': True},
+        'pg stories': {'author': 'pg', 'stories': True},
+        'python': {'q': 'python'},
+    }, batch=True, max_tags_length=1000)
+
+    assert sorted(job.key or '' for job in jobs) == [
+        '', 'pg stories', 'python']
+    batched = next(job for job in jobs if job.key is None)
+    assert str(batched.params['tags']) == 'comment,(author_pg,author_dang)'
+    assert batched.keys_by_tag == {
+        'author_pg': ['pg', 'also pg'], 'author_dang': ['dang']}
+
+
+def test_multi_search(fake_search):
+    fake = fake_search([
+        author_hit(1, 1542316220, 'pg'),
+        author_hit(2, 1542316210, 'dang'),
+        author_hit(3, 1542316200, 'pg', 'story'),
+        author_hit(4, 1542316190, 'tptacek'),
+        author_hit(5, 1542316180, 'pg'),
+    ], filter_tags=True)
+
+    found = list(api.Client().multi_search({
+        'pg': {'author': 'pg', 'comments': True},
+        'dang': {'author': 'dang', 'comments': True},
+        'pg stories': {'author': 'pg', 'stories': True},
+    }, max_workers=2))
+
+    by_key = {}
+    for key, hit in found:
+        by_key.setdefault(key, []).append(hit['objectID'])
+    assert by_key == {'pg': ['1', '5'], 'dang': ['2'], 'pg stories': ['3']}
+    # pg and dang's comments were fetched with a single search.
+    assert {query['tags'][0] for query in fake.requests} == {
+        'comment,(author_pg,author_dang)', 'story,author_pg'}
+
+
+def test_multi_search_raises_errors(fake_search):
+    fake_search([])
+
+    with pytest.raises(ValueError):
+        list(api.Client().multi_search({
+            'bad': {'author': 'pg', 'created_at__gt': 'yesterday'}}))
+
+
+def test_search_by_authors_packs_requests(fake_search):
+    authors = ['user{}'.format(i) for i in range(50)]
+    fake = fake_search([
+        author_hit(i, 1542316220 - i, author)
+        for i, author in enumerate(authors * 2)], filter_tags=True)
+
+    found = list(api.Client().search_by_authors(
+        authors, comments=True, max_tags_length=200))
+
+    assert len(found) == 100
+    assert all(hit['author'] == author for author, hit in found)
+    searches = {query['tags'][0] for query in fake.requests}
+    assert 1 < len(searches) < 50
+    assert all(len(tags) <= 200 for tags in searches)
+
+
+def test_search_by_story_ids(fake_search):
+    def story_hit(object_id, created_at_i, story_id, post_type='comment'):
+        return make_hit(object_id, created_at_i, _tags=[
+            post_type, 'author_pg', 'story_{}'.format(story_id)])
+
+    fake = fake_search([
+        story_hit(10, 1542316220, 10, 'story'),
+        story_hit(11, 1542316210, 10),
+        story_hit(21, 1542316200, 20),
+        story_hit(31, 1542316190, 30),
+    ], filter_tags=True)
+
+    found = list(api.Client().search_by_story_ids([10, 20, 40]))
+
+    assert sorted((key, hit['objectID']) for key, hit in found) == [
+        (10, '10'), (10, '11'), (20, '21')]
+    assert fake.requests[0]['tags'] == ['(story_10,story_20,story_40)']
@@ -0,0 +1,180 @@
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pytest
+import responses
+
+from hn import api
+from hn.cache import LRUCache, SQLiteCache, cache_key
+
+BASE_PATH = Path(__file__).parent
+REQUESTS_PATH = BASE_PATH / 'requests'
+
+
+def test_cache_key_is_independent_of_params_order():
+    assert cache_key('https://x/search', {'b': 2, 'a': 1}) == cache_key(
+        'https://x/search', {'a': 1, 'b': 2})
+    assert cache_key('https://x/items/1') == 'https://x/items/1'
+
+
+def test_ttl_per_endpoint_and_stable_windows(tmp_path):
+    cache = SQLiteCache(
+        tmp_path / 'cache.db',
+        ttl={'search_by_date': 60, 'users': 3600, 'default': None},
+        stable_after=86400)
+
+    assert cache.ttl_for('users') == 3600
+    assert cache.ttl_for('items') is None
+    assert cache.ttl_for('search_by_date', {'hitsPerPage': 10}) == 60
+    old_window = {'numericFilters': 'points>10,created_at_i<1514764800'}
+    assert cache.ttl_for('search_by_date', old_window) is None
+    recent_window = {
+        'numericFilters': 'created_at_i<={}'.format(int(time.time()))}
+    assert cache.ttl_for('search_by_date', recent_window) == 60
+
+
+def test_ttl_dict_has_to_cover_every_endpoint(tmp_path):
+    with pytest.raises(ValueError):
+        SQLiteCache(tmp_path / 'cache.db', ttl={'search_by_date': 60})
+
+    cache = SQLiteCache(tmp_path / 'cache.db', ttl={
+        'search_by_date': 60, 'items': None, 'users': 3600})
+    assert cache.ttl_for('items') is None
+    with pytest.raises(ValueError):
+        cache.ttl_for('comments')
+
+
+def test_expired_entries_are_misses(tmp_path):
+    cache = SQLiteCache(tmp_path / 'cache.db', ttl=-1)
+    cache.set('items', 'https://x/items/1', None, '{}')
+
+    assert cache.get('items', 'https://x/items/1') is None
+    assert cache.stats()['misses'] == 1
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = SQLiteCache(tmp_path / 'cache.db', max_size=10)
+    cache.set('items', 'https://x/items/1', None, '1234')
+    cache.set('items', 'https://x/items/2', None, '1234')
+    assert cache.get('items', 'https://x/items/1') == '1234'
+    cache.set('items', 'https://x/items/3', None, '1234')
+
+    assert cache.get('items', 'https://x/items/2') is None
+    assert cache.get('items', 'https://x/items/1') == '1234'
+    stats = cache.stats()
+    assert stats['evictions'] == 1
+    assert stats['entries'] == 2
+    assert stats['size'] == 8
+
+
+def test_total_size_is_kept_up_to_date(tmp_path):
+    path = tmp_path / 'cache.db'
+    cache = SQLiteCache(path, max_size=100)
+    cache.set('items', 'https://x/items/1', None, '1234')
+    cache.set('items', 'https://x/items/1', None, '123456')
+    cache.set('items', 'https://x/items/2', None, '12')
+    assert cache.stats()['size'] == 8
+    cache.close()
+
+    cache = SQLiteCache(path, ttl=-1, max_size=100)
+    assert cache.stats()['size'] == 8
+    # Expired entries are dropped on write, the ones without a ttl stay.
+    cache.set('items', 'https://x/items/3', None, '123')
+    assert cache.stats()['size'] == 8
+    assert cache.stats()['entries'] == 2
+
+    cache.set('users', 'https://x/users/pg', None, '123')
+    cache.clear()
+    assert cache.stats()['size'] == 0
+
+
+@responses.activate
+def test_client_reads_from_cache(tmp_path):
+    with (REQUESTS_PATH / 'item.json').open() as fp:
+        responses.add(
+            responses.GET, 'https://hn.algolia.com/api/v1/items/18562744',
+            json=json.loads(fp.read()), status=200)
+    responses.add(
+        responses.GET, 'https://hn.algolia.com/api/v1/items/0000',
+        status=404)
+
+    cache = SQLiteCache(tmp_path / 'cache.db')
+    client = api.Client(cache=cache)
+
+    assert client.get_item(18562744)['id'] == 18562744
+    assert client.get_item(18562744)['id'] == 18562744
+    assert client.get_item('0000') is None
+    assert client.get_item('0000') is None
+
+    assert len(responses.calls) == 3
+    assert cache.stats()['hits'] == 1
+
+
+def test_lru_cache_evicts_least_recently_used():
+    cache = LRUCache(maxsize=2)
+    assert cache.get_or_load('a', lambda: 1) == 1
+    assert cache.get_or_load('b', lambda: 2) == 2
+    assert cache.get_or_load('a', lambda: None) == 1
+    assert cache.get_or_load('c', lambda: 3) == 3
+
+    assert cache.get_or_load('b', lambda: 'reloaded') == 'reloaded'
+    assert cache.stats() == {'hits': 1, 'misses': 4, 'entries': 2}
+
+
+def test_lru_cache_ttl():
+    cache = LRUCache(ttl=-1)
+    cache.get_or_load('a', lambda: 1)
+    assert cache.get_or_load('a', lambda: 2) == 2
+
+
+def test_lru_cache_loads_concurrent_requests_once():
+    cache = LRUCache()
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def loader():
+        calls.append(1)
+        started.set()
+        release.wait()
+        return 'value'
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        first = executor.submit(cache.get_or_load, 'a', loader)
+        started.wait()
+        others = [executor.submit(cache.get_or_load, 'a', loader)
+                  for _ in range(3)]
+        time.sleep(0.05)
+        release.set()
+        results = [f.result() for f in [first] + others]
+
+    assert results == ['value'] * 4
+    assert len(calls) == 1
+
+
+def test_lru_cache_does_not_keep_errors():
+    cache = LRUCache()
+
+    def fail():
+        raise ValueError()
+
+    with pytest.raises(ValueError):
+        cache.get_or_load('a', fail)
+    assert cache.get_or_load('a', lambda: 1) == 1
+
+
+@responses.activate
+def test_client_memoizes_items_and_users():
+    with (REQUESTS_PATH / 'pg.json').open() as fp:
+        responses.add(
+            responses.GET, 'https://hn.algolia.com/api/v1/users/pg',
+            json=json.loads(fp.read()), status=200)
+
+    client = api.Client(memo=LRUCache(maxsize=100))
+    for _ in range(5):
+        assert client.get_user('pg')['username'] == 'pg'
+
+    assert len(responses.calls) == 1
@@ -0,0 +1,76 @@
+import csv
+import json
+
+import responses
+
+from hn.cli import main
+
+from conftest import make_hit
+
+
+def test_search(fake_search, capsys):
+    fake = fake_search([make_hit(i, 1542316220 - i) for i in range(3)])
+
+    assert main([
+        'search', '--comments', '--author', 'pg', '--points-gte', '1',
+        '--created-at-lt', '2018-11-16']) == 0
+
+    query = fake.requests[0]
+    assert query['tags'] == ['comment,author_pg']
+    assert query['numericFilters'] == [
+        'created_at_i<1542326400,points>=1']
+    lines = capsys.readouterr().out.splitlines()
+    assert [json.loads(line)['objectID'] for line in lines] == ['0', '1', '2']
+
+
+def test_search_csv_with_progress(fake_search, tmp_path, capsys):
+    fake_search([make_hit(i, 1542316220 - i) for i in range(3)])
+    output = tmp_path / 'hits.csv'
+
+    assert main([
+        'search', '--format', 'csv', '-o', str(output), '--progress',
+        '--parallel', '--concurrency', '2']) == 0
+
+    with open(output, newline='') as fp:
+        rows = list(csv.DictReader(fp))
+    assert sorted(row['objectID'] for row in rows) == ['0', '1', '2']
+    assert rows[0]['_tags'] == '["comment", "author_pg", "story_1"]'
+    assert capsys.readouterr().err.startswith('3 rows, ')
+
+
+@responses.activate
+def test_items_from_file(tmp_path, capsys):
+    responses.add(
+        responses.GET, 'https://hn.algolia.com/api/v1/items/1',
+        json={'id': 1, 'type': 'story'})
+    responses.add(
+        responses.GET, 'https://hn.algolia.com/api/v1/items/2', status=404)
+    responses.add(
+        responses.GET, 'https://hn.algolia.com/api/v1/items/3', status=500)
+    ids = tmp_path / 'ids.txt'
+    ids.write_text('# ids\n1\n2\n\n3\n')
+
+    assert main(['items', str(ids), '--retries', '0']) == 1
+
+    out, err = capsys.readouterr()
+    assert [json.loads(line)['id'] for line in out.splitlines()] == [1]
+    assert err.startswith('hn: 3: ')
+
+
+def test_export_command(fake_search, tmp_path):
+    fake = fake_search([make_hit(i, 1542316220 - i) for i in range(3)])
+
+    assert main([
+        'export', str(tmp_path), '--comments', '--author', 'pg',
+        '--points-gte', '1', '--compression', 'none']) == 0
+
+    query = fake.requests[0]
+    assert query['tags'] == ['comment,author_pg']
+    assert query['numericFilters'][0].startswith('points>=1')
+    with open(tmp_path / 'part-00000.jsonl') as fp:
+        assert len(fp.readlines()) == 3
+
+
+def test_invalid_filter(capsys):
+    assert main(['search', '--created-at-gt', 'yesterday']) == 2
+    assert capsys.readouterr().err.startswith('hn: error: ')
@@ -0,0 +1,64 @@
+import pytest
+
+from hn import api
+from hn.columnar import HitBatch
+
+from conftest import make_hit
+
+
+def _hits():
+    return [
+        make_hit(1, 1542316220, author='pg', points=10, story_id=None),
+        make_hit(2, 1542316219, author='dang', points=None, num_comments=3),
+        make_hit(3, 1542316218, author='pg', points=5, story_id=1),
+    ]
+
+
+def test_hit_batch_columns():
+    batch = HitBatch()
+    batch.extend(_hits())
+
+    assert len(batch) == 3
+    assert list(batch.columns['object_id']) == [1, 2, 3]
+    assert list(batch.columns['points']) == [10, 0, 5]
+    assert list(batch.valid['points']) == [1, 0, 1]
+    assert list(batch.author_codes) == [0, 1, 0]
+    assert batch.authors.values == ['pg', 'dang']
+
+
+def test_hit_batch_to_numpy():
+    np = pytest.importorskip('numpy')
+    batch = HitBatch()
+    batch.extend(_hits())
+
+    columns = batch.to_numpy()
+
+    assert columns['created_at_i'].dtype == np.int64
+    assert columns['created_at_i'].tolist() == [
+        1542316220, 1542316219, 1542316218]
+    assert columns['points'].tolist() == [10, None, 5]
+    assert columns['author_dictionary'][columns['author']].tolist() == [
+        'pg', 'dang', 'pg']
+
+
+def test_search_results_to_arrow(fake_search):
+    pa = pytest.importorskip('pyarrow')
+    fake_search(_hits())
+
+    table = api.Client().search_by_date(hits_per_page=2).to_arrow()
+
+    assert table.num_rows == 3
+    assert table.schema.field('points').type == pa.int64()
+    assert table.column('points').to_pylist() == [10, None, 5]
+    assert pa.types.is_dictionary(table.schema.field('author').type)
+    assert table.column('author').to_pylist() == ['pg', 'dang', 'pg']
+
+
+def test_search_results_batches_share_author_dictionary(fake_search):
+    fake_search(_hits())
+
+    batches = list(api.Client().search_by_date(hits_per_page=2).batches())
+
+    assert [len(batch) for batch in batches] == [2, 1]
+    assert batches[0].authors is batches[1].authors
+    assert list(batches[1].author_codes) == [0]
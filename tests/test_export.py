@@ -0,0 +1,100 @@
+import gzip
+import json
+import os
+
+import pytest
+
+import hn.export
+from hn import api
+from hn.export import export
+
+from conftest import make_hit
+
+
+def read_jsonl(path):
+    with gzip.open(path, 'rt') as fp:
+        return [json.loads(line) for line in fp]
+
+
+def test_export_rotates_files(fake_search, tmp_path):
+    fake_search([make_hit(i, 1542316220 - i) for i in range(5)])
+
+    manifest = export(
+        tmp_path, rows_per_file=2, client=api.Client(), hits_per_page=2)
+
+    assert manifest['complete']
+    assert manifest['rows'] == 5
+    names = [part['name'] for part in manifest['files']]
+    assert names == [
+        'part-00000.jsonl.gz', 'part-00001.jsonl.gz', 'part-00002.jsonl.gz']
+    hits = [hit for name in names for hit in read_jsonl(tmp_path / name)]
+    assert [hit['objectID'] for hit in hits] == ['0', '1', '2', '3', '4']
+    assert not list(tmp_path.glob('*.tmp'))
+    with open(tmp_path / 'manifest.json') as fp:
+        assert json.load(fp) == manifest
+
+
+def test_export_resumes(fake_search, tmp_path, monkeypatch):
+    fake = fake_search([make_hit(i, 1542316220 - i) for i in range(6)])
+    client = api.Client()
+
+    replace = os.replace
+
+    def interrupt_after_first_file(src, dst):
+        if dst.endswith('part-00001.jsonl.gz'):
+            raise KeyboardInterrupt
+        return replace(src, dst)
+
+    monkeypatch.setattr(hn.export.os, 'replace', interrupt_after_first_file)
+    with pytest.raises(KeyboardInterrupt):
+        export(tmp_path, rows_per_file=2, client=client, hits_per_page=2)
+    monkeypatch.undo()
+
+    requests_before = len(fake.requests)
+    manifest = export(
+        tmp_path, rows_per_file=2, client=client, hits_per_page=2)
+
+    # The second run picks up after the first file.
+    assert fake.requests[requests_before]['numericFilters'] == [
+        'created_at_i<=1542316219']
+    hits = [
+        hit for part in manifest['files']
+        for hit in read_jsonl(tmp_path / part['name'])]
+    assert [hit['objectID'] for hit in hits] == [str(i) for i in range(6)]
+
+    # Once complete, running it again is a no-op.
+    requests_before = len(fake.requests)
+    assert export(tmp_path, client=client, hits_per_page=2) == manifest
+    assert len(fake.requests) == requests_before
+
+
+def test_export_rejects_different_query(fake_search, tmp_path):
+    fake_search([make_hit(1, 1542316220)])
+    export(tmp_path, client=api.Client(), author='pg')
+
+    with pytest.raises(ValueError):
+        export(tmp_path, client=api.Client(), author='dang')
+
+
+def test_export_rejects_different_compression(fake_search, tmp_path):
+    fake_search([make_hit(1, 1542316220)])
+    export(tmp_path, client=api.Client(), author='pg')
+
+    with pytest.raises(ValueError):
+        export(tmp_path, client=api.Client(), author='pg', compression=None)
+
+
+def test_export_parquet(fake_search, tmp_path):
+    pq = pytest.importorskip('pyarrow.parquet')
+    fake_search([make_hit(i, 1542316220 - i) for i in range(3)])
+
+    manifest = export(
+        tmp_path, format='parquet', compression='snappy',
+        client=api.Client())
+
+    assert manifest['files'] == [{'name': 'part-00000.parquet', 'rows': 3}]
+    table = pq.read_table(tmp_path / 'part-00000.parquet')
+    assert table.column('objectID').to_pylist() == ['0', '1', '2']
+    assert table.column('_tags').to_pylist()[0] == [
+        'comment', 'author_pg', 'story_1']
+
@@ -0,0 +1,75 @@
+import responses
+
+from hn import api
+from hn.cli import main
+from hn.metrics import Callback, Histogram, Metrics
+from hn.retry import Retry
+
+from conftest import make_hit
+
+
+def test_histogram_buckets():
+    histogram = Histogram(buckets=(0.1, 1))
+    for value in (0.05, 0.1, 0.5, 3):
+        histogram.observe(value)
+
+    assert list(histogram.cumulative_counts()) == [
+        (0.1, 2), (1, 3), (float('inf'), 4)]
+    assert histogram.count == 4
+    assert histogram.sum == 3.65
+
+
+def test_callback_receives_search_events(fake_search):
+    fake_search([make_hit(i, 1542316220 - i) for i in range(3)])
+    events = []
+    client = api.Client(
+        hooks=Callback(lambda event, fields: events.append((event, fields))))
+
+    assert len(list(client.search_by_date(hits_per_page=2))) == 3
+
+    names = [event for event, _ in events]
+    assert names[:4] == ['request', 'response', 'decode', 'page']
+    response = events[1][1]
+    assert response['endpoint'] == 'search_by_date'
+    assert response['status_code'] == 200
+    assert response['size'] > 0
+    assert events[2][1]['nb_hits'] == 3
+    assert sum(fields['hits'] for event, fields in events
+               if event == 'page') == 3
+
+
+@responses.activate
+def test_metrics_count_retries(monkeypatch):
+    monkeypatch.setattr('hn.retry.time.sleep', lambda seconds: None)
+    responses.add(
+        responses.GET, 'https://hn.algolia.com/api/v1/items/1', status=503)
+    responses.add(
+        responses.GET, 'https://hn.algolia.com/api/v1/items/1',
+        json={'id': 1, 'processingTimeMS': 2})
+    metrics = Metrics()
+    client = api.Client(retry=Retry(backoff_factor=0), hooks=metrics)
+
+    assert client.get_item(1)['id'] == 1
+
+    snapshot = metrics.snapshot()
+    assert snapshot['requests_total{endpoint=items,status=503}'] == 1
+    assert snapshot['requests_total{endpoint=items,status=200}'] == 1
+    assert snapshot['retries_total{endpoint=items,reason=503}'] == 1
+    assert snapshot['request_seconds_count{endpoint=items}'] == 2
+    assert snapshot['processing_seconds_sum{endpoint=items}'] == 0.002
+    assert snapshot['requests_in_flight'] == 0
+
+    text = metrics.to_prometheus()
+    assert '# TYPE hn_requests_total counter\n' in text
+    assert 'hn_requests_total{endpoint="items",status="503"} 1\n' in text
+    assert ('hn_request_seconds_bucket{endpoint="items",le="+Inf"} 2\n'
+            in text)
+
+
+def test_cli_writes_metrics(fake_search, tmp_path, capsys):
+    fake_search([make_hit(1, 1542316220)])
+    path = tmp_path / 'metrics.prom'
+
+    assert main(['search', '--metrics', str(path)]) == 0
+
+    assert 'hn_hits_total 1\n' in path.read_text()
@@ -0,0 +1,123 @@
+import time
+
+import pytest
+
+from hn import api
+from hn.models import Hit
+from hn.pagination import SearchCursor
+
+from conftest import make_hit
+
+
+def test_cursor_dumps_and_loads():
+    cursor = SearchCursor(1542316220, ['3', '1', '2'])
+    assert SearchCursor.loads(cursor.dumps()) == cursor
+    assert SearchCursor.loads(SearchCursor().dumps()) == SearchCursor()
+
+    with pytest.raises(ValueError):
+        SearchCursor.loads('not-a-cursor')
+
+
+def test_cursor_request_params():
+    params = {'hitsPerPage': 2, 'query': 'python'}
+    assert SearchCursor().request_params(params, None) is params
+
+    cursor = SearchCursor(1542316220, ['1', '2', '3'])
+    assert cursor.request_params(params, None) == {
+        'hitsPerPage': 2,
+        'query': 'python',
+        'numericFilters': 'created_at_i<=1542316220',
+        'page': 1,
+    }
+
+
+def test_search_by_date_keeps_hits_sharing_a_second(fake_search):
+    hits = [make_hit(i, 1542316220 - i // 5) for i in range(23)]
+    fake_search(hits)
+
+    found = list(api.Client().search_by_date(hits_per_page=3))
+
+    assert [hit['objectID'] for hit in found] == [
+        hit['objectID'] for hit in hits]
+
+
+def test_search_by_date_resumes_from_cursor(fake_search):
+    hits = [make_hit(i, 1542316220 - i // 4) for i in range(20)]
+    fake = fake_search(hits)
+
+    results = api.Client().search_by_date(hits_per_page=3, points__gt=-1)
+    first = [next(results) for _ in range(9)]
+    token = results.cursor.dumps()
+
+    requests_before_resume = len(fake.requests)
+    rest = list(api.Client().search_by_date(
+        hits_per_page=3, points__gt=-1, cursor=token))
+
+    assert [hit['objectID'] for hit in first + rest] == [
+        hit['objectID'] for hit in hits]
+    # The resumed crawl starts at the page holding the cursor.
+    assert 'page' not in fake.requests[requests_before_resume]
+    assert fake.requests[requests_before_resume]['numericFilters'] == [
+        'points>-1,created_at_i<=1542316218']
+
+
+def test_search_by_date_streaming_drops_keys(fake_search):
+    hits = [make_hit(i, 1542316220 - i, _highlightResult={'author': {}})
+            for i in range(10)]
+    fake_search(hits)
+
+    found = list(api.Client().search_by_date(
+        hits_per_page=4, stream=True, drop_keys=['_highlightResult']))
+
+    assert [hit['objectID'] for hit in found] == [
+        hit['objectID'] for hit in hits]
+    assert all('_highlightResult' not in hit for hit in found)
+
+
+def test_search_by_date_result_type(fake_search):
+    fake_search([make_hit(i, 1542316220 - i) for i in range(5)])
+
+    found = list(api.Client().search_by_date(
+        hits_per_page=2, result_type=Hit))
+
+    assert all(isinstance(hit, Hit) for hit in found)
+    assert [hit.object_id for hit in found] == ['0', '1', '2', '3', '4']
+
+
+def test_search_by_date_prefetch(fake_search):
+    hits = [make_hit(i, 1542316220 - i) for i in range(20)]
+    fake = fake_search(hits)
+
+    results = api.Client().search_by_date(hits_per_page=2, prefetch=1)
+    first = next(results)
+    time.sleep(0.2)
+    requests_made = len(fake.requests)
+    time.sleep(0.2)
+
+    # Prefetching stops once the buffer is full.
+    assert len(fake.requests) == requests_made
+    assert requests_made < len(hits) - 1
+    assert results.cursor == SearchCursor(1542316220, ['0'])
+
+    rest = list(results)
+    assert [hit['objectID'] for hit in [first] + rest] == [
+        hit['objectID'] for hit in hits]
+
+
+def test_search_by_date_prefetch_keeps_hits_sharing_a_second(fake_search):
+    hits = [make_hit(i, 1542316220 - i // 3) for i in range(20)]
+    fake_search(hits)
+
+    found = list(api.Client().search_by_date(hits_per_page=2, prefetch=3))
+
+    assert [hit['objectID'] for hit in found] == [
+        hit['objectID'] for hit in hits]
+
+
+def test_search_by_date_prefetch_raises_errors(fake_search):
+    hit = make_hit(1, 1542316220)
+    del hit['objectID']
+    fake_search([hit])
+
+    with pytest.raises(KeyError):
+        list(api.Client().search_by_date(hits_per_page=2, prefetch=2))
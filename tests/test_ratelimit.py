@@ -0,0 +1,76 @@
+import pytest
+import responses
+
+from hn import api
+from hn.ratelimit import RateLimiter
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+def _limiter(monkeypatch, **kwargs):
+    clock = FakeClock()
+    monkeypatch.setattr('hn.ratelimit.time', clock)
+    return RateLimiter(**kwargs), clock
+
+
+def test_bursts_then_paces_requests(monkeypatch):
+    limiter, clock = _limiter(monkeypatch, rate=2, burst=3)
+
+    for _ in range(5):
+        limiter.acquire()
+
+    assert clock.sleeps == [0.5, 0.5]
+
+
+def test_additive_increase_multiplicative_decrease(monkeypatch):
+    limiter, clock = _limiter(
+        monkeypatch, rate=10, max_rate=20, increase=1, target_latency=1)
+
+    limiter.on_success(latency=0.1)
+    limiter.on_success(latency=0.1)
+    assert limiter.rate == 12
+    limiter.on_success(latency=2)
+    assert limiter.rate == 6
+    limiter.on_throttle()
+    assert limiter.rate == 3
+    for _ in range(30):
+        limiter.on_success()
+    assert limiter.rate == 20
+
+
+def test_throttle_waits_for_retry_after(monkeypatch):
+    limiter, clock = _limiter(monkeypatch, rate=10, min_rate=10)
+
+    limiter.on_throttle(retry_after=2)
+    limiter.acquire()
+
+    assert sum(clock.sleeps) == pytest.approx(2.1)
+
+
+@responses.activate
+def test_client_retries_throttled_requests(monkeypatch):
+    limiter, clock = _limiter(monkeypatch, rate=10)
+    responses.add(
+        responses.GET, 'https://hn.algolia.com/api/v1/users/pg', status=429,
+        headers={'Retry-After': '1'})
+    responses.add(
+        responses.GET, 'https://hn.algolia.com/api/v1/users/pg',
+        json={'username': 'pg'}, status=200)
+
+    user = api.Client(rate_limiter=limiter).get_user('pg')
+
+    assert user == {'username': 'pg'}
+    assert len(responses.calls) == 2
+    assert limiter.rate == pytest.approx(5.1)
+    assert sum(clock.sleeps) >= 1
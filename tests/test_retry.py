@@ -0,0 +1,89 @@
+import pytest
+import requests
+import responses
+
+from hn import api
+from hn.retry import Retry
+
+from conftest import make_hit
+
+
+def test_backoff():
+    retry = Retry(backoff_factor=1, max_backoff=5, jitter=False)
+    assert [retry.backoff(attempt) for attempt in range(5)] == [1, 2, 4, 5, 5]
+    assert retry.backoff(0, retry_after=3) == 3
+
+    retry = Retry(backoff_factor=1)
+    assert all(0 <= retry.backoff(2) <= 4 for _ in range(100))
+
+
+def test_is_retryable():
+    retry = Retry(total=2)
+    assert retry.is_retryable(0, status_code=503)
+    assert not retry.is_retryable(0, status_code=404)
+    assert retry.is_retryable(1, exception=requests.ConnectionError())
+    assert not retry.is_retryable(0, exception=ValueError())
+    assert not retry.is_retryable(2, status_code=503)
+
+
+@responses.activate
+def test_client_retries_errors(monkeypatch):
+    monkeypatch.setattr('hn.retry.time.sleep', lambda seconds: None)
+    url = 'https://hn.algolia.com/api/v1/users/pg'
+    responses.add(responses.GET, url, body=requests.ConnectionError())
+    responses.add(responses.GET, url, status=502)
+    responses.add(responses.GET, url, json={'username': 'pg'}, status=200)
+
+    client = api.Client(retry=Retry(total=2))
+
+    assert client.get_user('pg') == {'username': 'pg'}
+    assert len(responses.calls) == 3
+
+
+@responses.activate
+def test_client_gives_up_after_total_retries(monkeypatch):
+    monkeypatch.setattr('hn.retry.time.sleep', lambda seconds: None)
+    responses.add(
+        responses.GET, 'https://hn.algolia.com/api/v1/users/pg', status=500)
+
+    with pytest.raises(requests.HTTPError):
+        api.Client(retry=Retry(total=2)).get_user('pg')
+    assert len(responses.calls) == 3
+
+
+def test_search_by_date_resumes_broken_streamed_page(fake_search, monkeypatch):
+    monkeypatch.setattr('hn.retry.time.sleep', lambda seconds: None)
+    hits = [make_hit(i, 1542316220 - i // 2) for i in range(10)]
+    fake_search(hits)
+
+    client = api.Client(retry=Retry(total=1))
+    stream_search_page = client._stream_search_page
+    broken = []
+
+    def flaky_stream_search_page(params):
+        for position, hit in enumerate(stream_search_page(params)):
+            if position == 3 and not broken:
+                broken.append(params)
+                raise requests.exceptions.ChunkedEncodingError()
+            yield hit
+
+    monkeypatch.setattr(
+        client, '_stream_search_page', flaky_stream_search_page)
+
+    found = list(client.search_by_date(hits_per_page=4, stream=True))
+
+    assert broken
+    assert [hit['objectID'] for hit in found] == [
+        hit['objectID'] for hit in hits]
+
+
+@responses.activate
+def test_streamed_search_does_not_compound_retries(monkeypatch):
+    monkeypatch.setattr('hn.retry.time.sleep', lambda seconds: None)
+    responses.add(
+        responses.GET, 'https://hn.algolia.com/api/v1/search_by_date',
+        body=requests.ConnectionError())
+
+    with pytest.raises(requests.ConnectionError):
+        list(api.Client(retry=Retry(total=3)).search_by_date(stream=True))
+    assert len(responses.calls) == 4
@@ -0,0 +1,103 @@
+import functools
+
+import pytest
+
+from hn import tags
+from hn.models import Author, Hit, Or, PostType, StoryID
+from hn.store import Store, query_to_sql
+
+from conftest import make_hit
+
+
+def _hits():
+    return [
+        make_hit(1, 1514764800, author='pg', points=100, num_comments=20,
+                 title='Lisp is great', _tags=['story', 'author_pg', 'story_1']),
+        make_hit(2, 1514764900, author='dang', points=None, story_id=1,
+                 comment_text='About Lisp', _tags=[
+                     'comment', 'author_dang', 'story_1']),
+        make_hit(3, 1514765000, author='pg', points=None, story_id=1,
+                 comment_text='Reply', _tags=['comment', 'author_pg', 'story_1']),
+        make_hit(4, 1546300800, author='tptacek', points=5, num_comments=0,
+                 title='Ask HN: Python?', _tags=[
+                     'story', 'author_tptacek', 'story_4', 'ask_hn']),
+    ]
+
+
+@pytest.fixture
+def store(tmp_path):
+    with Store(tmp_path / 'hn.db') as store:
+        assert store.load(_hits(), batch_size=3) == 4
+        yield store
+
+
+def _ids(hits):
+    return [int(hit['objectID']) for hit in hits]
+
+
+def test_query_to_sql():
+    assert query_to_sql() == ('1', [])
+    assert query_to_sql(tags=Author('pg') & (tags.Story | StoryID(1))) == (
+        '(author = ? AND '
+        'object_id IN (SELECT object_id FROM hit_tags WHERE tag IN (?, ?)))',
+        ['pg', 'story', 'story_1'])
+
+
+def test_query_to_sql_flattens_or_chains():
+    watchlist = Author('a') | (tags.AskHN | Author('b')) | (
+        Author('c') & tags.Story) | StoryID(1) | Author('a')
+    assert query_to_sql(tags=watchlist) == (
+        '(author IN (?, ?) OR '
+        'object_id IN (SELECT object_id FROM hit_tags WHERE tag IN (?, ?)) OR '
+        '(author = ? AND '
+        'object_id IN (SELECT object_id FROM hit_tags WHERE tag = ?)))',
+        ['a', 'b', 'ask_hn', 'story_1', 'c', 'story'])
+
+
+def test_query_everything_newest_first(store):
+    assert _ids(store.query()) == [4, 3, 2, 1]
+    assert _ids(store.query(limit=2)) == [4, 3]
+
+
+def test_query_tags_and_shortcuts(store):
+    assert _ids(store.query(author='pg')) == [3, 1]
+    assert _ids(store.query(stories=True)) == [4, 1]
+    assert _ids(store.query(author='pg', comments=True)) == [3]
+    assert _ids(store.query(tags=PostType('comment') & StoryID(1))) == [3, 2]
+    assert _ids(store.query(tags=Author('dang') | tags.AskHN)) == [4, 2]
+
+
+def test_query_thousands_of_ored_tags(store):
+    authors = functools.reduce(
+        Or, [Author('user{}'.format(i)) for i in range(3000)] + [
+            Author('dang')])
+    assert _ids(store.query(tags=authors)) == [2]
+    assert store.count(tags=Author('pg') & authors) == 0
+
+    stories = functools.reduce(
+        Or, [StoryID(i) for i in range(1000, 4000)] + [tags.AskHN])
+    assert store.count(tags=stories | authors) == 2
+
+
+def test_query_filters(store):
+    assert _ids(store.query(created_at__gte='2018-01-01 00:01:40')) == [
+        4, 3, 2]
+    assert _ids(store.query(created_at__lt='2019', points__gt=10)) == [1]
+    assert store.count(num_comments__gte=0) == 4
+    assert store.count(stories=True, num_comments__gt=0) == 1
+
+
+def test_query_text(store):
+    assert _ids(store.query('lisp')) == [2, 1]
+    assert _ids(store.query('ask python')) == [4]
+
+
+def test_load_replaces_hits(store):
+    updated = make_hit(1, 1514764800, author='pg', points=150,
+                       _tags=['story', 'author_pg', 'front_page'])
+    store.load([updated])
+
+    assert store.count() == 4
+    hit, = store.query(tags=tags.FrontPage, result_type=Hit)
+    assert hit.points == 150
+    assert store.count(stories=True) == 2
@@ -0,0 +1,57 @@
+import json
+
+from hn import api
+from hn.sync import SyncState, query_key, sync
+
+from conftest import make_hit
+
+
+def test_query_key_ignores_page_size():
+    assert query_key({'hitsPerPage': 10, 'tags': 'story'}) == query_key(
+        {'tags': 'story', 'hitsPerPage': 1000})
+    assert query_key({'tags': 'story'}) != query_key({'tags': 'comment'})
+
+
+def test_sync_state_persists(tmp_path):
+    path = tmp_path / 'state.json'
+    state = SyncState(path)
+    state.set('key', 1542316220)
+    state.save()
+
+    mark = SyncState(path).get('key')
+    assert mark['created_at_i'] == 1542316220
+    assert set(mark) == {'created_at_i', 'synced_at'}
+    assert SyncState(path).get('other') is None
+
+
+def test_sync_fetches_only_new_hits(fake_search, tmp_path):
+    hits = [make_hit(i, 1542316220 - i * 100) for i in range(10)]
+    fake = fake_search(hits)
+    state = SyncState(tmp_path / 'state.json')
+    client = api.Client()
+
+    first_run = list(sync(state, stories=True, client=client, overlap=150))
+    assert len(first_run) == 10
+
+    fake.hits[:0] = [make_hit(11, 1542316500), make_hit(10, 1542316400)]
+    second_run = list(sync(state, stories=True, client=client, overlap=150))
+
+    # New hits plus the ones within the overlap.
+    assert [hit['objectID'] for hit in second_run] == ['11', '10', '0', '1']
+    assert fake.requests[-1]['numericFilters'][0].startswith(
+        'created_at_i>=1542316070')
+
+    with open(tmp_path / 'state.json') as fp:
+        marks = json.load(fp)
+    assert [mark['created_at_i'] for mark in marks.values()] == [1542316500]
+
+
+def test_sync_keeps_state_if_interrupted(fake_search, tmp_path):
+    fake_search([make_hit(i, 1542316220 - i) for i in range(10)])
+    state = SyncState(tmp_path / 'state.json')
+
+    run = sync(state, client=api.Client(), hits_per_page=2)
+    next(run)
+    run.close()
+
+    assert not (tmp_path / 'state.json').exists()
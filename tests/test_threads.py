@@ -0,0 +1,116 @@
+import json
+from pathlib import Path
+
+import responses
+
+from hn import api
+from hn.threads import Thread, Node, get_thread
+
+from conftest import FakeSearchByDate, make_hit
+
+REQUESTS_PATH = Path(__file__).parent / 'requests'
+SEARCH_URL = 'https://hn.algolia.com/api/v1/search_by_date'
+
+
+def comment_hit(object_id, created_at_i, parent_id, story_id=1):
+    return make_hit(
+        object_id, created_at_i, parent_id=parent_id, story_id=story_id,
+        comment_text='comment {}'.format(object_id),
+        _tags=['comment', 'author_pg', 'story_{}'.format(story_id)])
+
+
+def story_hit(num_comments):
+    return make_hit(
+        1, 1542316000, num_comments=num_comments, story_text='story',
+        _tags=['story', 'author_pg', 'story_1'])
+
+
+def test_thread_index():
+    thread = Thread(Node(1, None, 100, 'pg', 'story'), [
+        Node(4, 2, 104, 'dang', 'd'),
+        Node(2, 1, 102, 'pg', 'b'),
+        Node(3, 1, 103, None, 'c'),
+        Node(5, 2, 101, 'dang', 'e'),
+        Node(6, 99, 105, 'pg', 'orphan'),
+    ])
+
+    assert len(thread) == 6
+    assert thread.children_of(1) == [2, 3]
+    assert thread.children_of(2) == [5, 4]
+    assert thread.children_of(3) == []
+    assert thread.parent_of(4) == 2
+    assert thread.parent_of(1) is None
+    assert thread.orphans() == [6]
+    assert list(thread.walk()) == [(0, 1), (1, 2), (2, 5), (2, 4), (1, 3)]
+    assert list(thread.walk(2)) == [(0, 2), (1, 5), (1, 4)]
+    assert thread.item(4) == {
+        'id': 4, 'parent_id': 2, 'created_at_i': 104, 'author': 'dang',
+        'text': 'd'}
+    assert thread.authors.values == ['pg', 'dang']
+
+
+def test_small_thread_is_fetched_nested():
+    with responses.RequestsMock() as rsps:
+        rsps.add_callback(
+            responses.GET, SEARCH_URL,
+            callback=FakeSearchByDate([story_hit(4)]))
+        with (REQUESTS_PATH / 'item.json').open() as fp:
+            item = json.load(fp)
+        rsps.add(
+            responses.GET, 'https://hn.algolia.com/api/v1/items/18562744',
+            json=item)
+
+        thread = get_thread(18562744, client=api.Client())
+
+    assert thread.story_id == 18562744
+    assert thread.children_of(18562744) == [
+        child['id'] for child in sorted(
+            item['children'], key=lambda c: (c['created_at_i'], c['id']))]
+    assert not thread.orphans()
+
+
+def test_big_thread_is_swept_and_repaired():
+    fake = FakeSearchByDate([
+        story_hit(5),
+        comment_hit(2, 1542316010, 1),
+        comment_hit(3, 1542316020, 2),
+        comment_hit(5, 1542316040, 4),
+        comment_hit(6, 1542316050, 1),
+    ], filter_tags=True)
+    with responses.RequestsMock() as rsps:
+        rsps.add_callback(responses.GET, SEARCH_URL, callback=fake)
+        # Comment 4 isn't in the search index.
+        rsps.add(
+            responses.GET, 'https://hn.algolia.com/api/v1/items/4',
+            json={'id': 4, 'parent_id': 3, 'created_at_i': 1542316030,
+                  'author': 'pg', 'text': 'comment 4', 'children': [
+                      {'id': 7, 'parent_id': 4, 'created_at_i': 1542316060,
+                       'author': 'dang', 'text': 'comment 7'}]})
+
+        thread = get_thread(1, client=api.Client(), max_nested=2)
+
+    assert list(thread.walk()) == [
+        (0, 1), (1, 2), (2, 3), (3, 4), (4, 5), (4, 7), (1, 6)]
+    assert thread.item(7)['author'] == 'dang'
+    assert thread.item(1)['text'] == 'story'
+    assert not thread.orphans()
+
+
+def test_big_thread_sweep_is_bounded_by_newest_comment():
+    # Comments come in a burst after the story, the thread is long quiet.
+    comments = [comment_hit(i, 1542316010 + i // 4, 1) for i in range(2, 202)]
+    fake = FakeSearchByDate([story_hit(200)] + comments, filter_tags=True)
+    with responses.RequestsMock() as rsps:
+        rsps.add_callback(responses.GET, SEARCH_URL, callback=fake)
+        thread = get_thread(
+            1, client=api.Client(), max_nested=10, max_workers=4,
+            max_window_hits=50)
+
+    assert len(thread) == 201
+    assert not thread.orphans()
+    windows = [
+        query['numericFilters'][0] for query in fake.requests
+        if 'numericFilters' in query and 'page' not in query]
+    newest = comments[-1]['created_at_i']
+    assert all(
+        int(window.rsplit('<', 1)[1]) <= newest + 1 for window in windows)
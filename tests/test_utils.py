@@ -1,3 +1,4 @@
+import json
 import pytest
 from datetime import datetime
 
@@ -17,3 +18,88 @@ def test_parse_date():
 
     with pytest.raises(ValueError):
         utils.parse_date('2018-13')
+
+
+@pytest.mark.parametrize('value', [
+    '2018', '2018-09', '2018-09-03', '2018-09-03 18:45:11',
+    '2018-09-03T18:45:11Z', '2018-09-03T18:45:11.000Z',
+    '2018-09-03T18:45:11.5Z', '2018-09-03T18:45:11.123456Z',
+])
+def test_parse_date_fast_path_matches_strptime(value):
+    assert utils.parse_date(value) == utils._strptime(value)
+
+
+@pytest.mark.parametrize('value', [
+    '2018-02-30', '18-09-03', '2018-09-03T18:45:11',
+    '2018-09-03 18:45:11Z', '2018-W01-1', '+018',
+])
+def test_parse_date_rejects_what_strptime_rejects(value):
+    with pytest.raises(ValueError):
+        utils.parse_date(value)
+
+
+def test_iter_json_hits_decodes_across_chunks():
+    doc = {
+        'hits': [
+            {'objectID': '1', 'text': 'a ] tricky, {string}'},
+            {'objectID': '2', '_highlightResult': {'a': [1, 2]}},
+        ],
+        'nbHits': 2,
+    }
+    body = json.dumps(doc, indent=2)
+
+    for chunk_size in (1, 7, len(body)):
+        chunks = [body[i:i + chunk_size]
+                  for i in range(0, len(body), chunk_size)]
+        assert list(utils.iter_json_hits(chunks)) == doc['hits']
+
+
+def test_iter_json_hits_without_leading_hits_key():
+    body = json.dumps({'nbHits': 1, 'query': 'x' * 100, 'hits': [{'a': 1}]})
+    assert list(utils.iter_json_hits([body])) == [{'a': 1}]
+
+
+def test_iter_json_hits_empty_and_incomplete():
+    assert list(utils.iter_json_hits(['{"hits": [], "nbHits": 0}'])) == []
+
+    with pytest.raises(ValueError):
+        list(utils.iter_json_hits(['{"hits": [{"a": 1}, {"b"']))
+    with pytest.raises(ValueError):
+        list(utils.iter_json_hits([]))
+    with pytest.raises(ValueError):
+        list(utils.iter_json_hits(['']))
+
+
+def test_put_pages():
+    pages = []
+    assert utils.put_pages(range(5), 2, lambda page: pages.append(page) or 1)
+    assert pages == [[0, 1], [2, 3], [4]]
+    assert not utils.put_pages(range(5), 2, lambda page: False)
+
+
+def test_fan_in_runs_submitted_tasks():
+    def task(n):
+        def run(put, submit):
+            if n > 1:
+                submit(task(n - 1))
+            put(n)
+        return run
+
+    assert sorted(utils.fan_in([task(3), task(1)], max_workers=2)) == [
+        1, 1, 2, 3]
+
+
+def test_fan_in_raises_task_errors_and_stops():
+    def failing(put, submit):
+        raise ValueError('boom')
+
+    def endless(put, submit):
+        while put('item'):
+            pass
+
+    with pytest.raises(ValueError):
+        list(utils.fan_in([endless, failing], max_workers=2))
+
+    items = utils.fan_in([endless], max_workers=1)
+    assert next(items) == 'item'
+    items.close()